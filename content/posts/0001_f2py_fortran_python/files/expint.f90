@@ -54,3 +54,39 @@ subroutine expi(x, ei)
   end if
 
 end subroutine expi
+
+subroutine expi_array(x, ei, n)
+  ! Exponential integral Ei(x) for an array of x.
+  !
+  ! Parameters
+  ! ----------
+  ! x : real(real64), dimension(n)
+  !   Real numbers ≥ 0.
+  !    
+  ! Returns
+  ! -------
+  ! ei : real(real64), dimension(n)
+  !   Exponential integral of x.
+  !
+  ! History
+  ! -------
+  ! 17-10-2026 - Rodrigo Castro - Array version of expi, calling it for each element
+  !
+  ! Reference
+  ! ----------
+  ! See expi.
+
+  use, intrinsic :: iso_fortran_env, only: real64
+
+  implicit none
+  integer, intent(in) :: n
+  real(real64), intent(in) :: x(n)
+  real(real64), intent(out) :: ei(n)
+  !f2py integer, intent(hide), depend(x) :: n = len(x)
+  integer :: i
+
+  do i = 1, n
+    call expi(x(i), ei(i))
+  end do
+
+end subroutine expi_array
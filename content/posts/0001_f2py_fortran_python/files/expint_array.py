@@ -0,0 +1,67 @@
+import numpy as np
+
+try:
+    from expint import expi_array as expi_fortran
+except ImportError:
+    expi_fortran = None
+
+gm = 0.5772156649015329  # Euler's constant
+
+
+def expi_numpy(x):
+    """Exponential integral Ei(x) for x ≥ 0, scalar or array.
+
+    NumPy version of the expi subroutine in expint.f90, with the same series
+    expansion for x ≤ 40 and asymptotic expansion for x > 40. Ei is NaN for
+    x < 0 and NaN, as the log of the series gives in expi_array.
+    """
+
+    x = np.asarray(x, dtype=np.float64)
+    ei = np.full_like(x, np.nan)
+
+    zero = x == 0.0
+    series = (x > 0.0) & (x <= 40.0)
+    asymptotic = x > 40.0
+
+    ei[zero] = -1.0e+300
+
+    # Series expansion. Terms are added while they are not negligible.
+    xs = x[series]
+    eis = xs.copy()
+    r = xs.copy()
+    active = np.ones(xs.shape, dtype=bool)
+    for n in range(2, 101):
+        r[active] = r[active] * xs[active] * (n-1) / n**2
+        eis[active] = eis[active] + r[active]
+        active &= np.abs(r) > 1.0e-15*np.abs(eis)
+        if not active.any():
+            break
+    ei[series] = eis + gm + np.log(xs)
+
+    # Asymptotic expansion.
+    xa = x[asymptotic]
+    eia = np.ones_like(xa)
+    r = np.ones_like(xa)
+    for n in range(1, 21):
+        r = r * n / xa
+        eia = eia + r
+    ei[asymptotic] = np.exp(xa) * eia / xa
+
+    return ei[()]
+
+
+def expi(x):
+    """Exponential integral Ei(x) for x ≥ 0, scalar or array.
+
+    Uses the expi_array subroutine of the expint extension module, if it was
+    built with F2PY, and expi_numpy otherwise.
+    """
+
+    x = np.asarray(x, dtype=np.float64)
+
+    if expi_fortran is None:
+        return expi_numpy(x)
+
+    ei = expi_fortran(np.ascontiguousarray(x.ravel()))
+
+    return ei.reshape(x.shape)[()]
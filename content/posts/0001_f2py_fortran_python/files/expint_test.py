@@ -1,4 +1,4 @@
-from expint import expi
+from expint_array import expi
 import mpmath
 import matplotlib.pyplot as plt
 import numpy as np
@@ -6,11 +6,11 @@ import numpy as np
 mpmath.dps = 16 # mpmath precision
 
 xv = np.logspace(-10, 2, 1000, dtype=np.float64)
-ei_expint = np.empty(xv.shape, dtype=np.float64)
 ei_mpmath = np.empty(xv.shape, dtype=np.float64)
 
+ei_expint = expi(xv)
+
 for i, x in enumerate(xv):
-    ei_expint[i] = expi(x)
     ei_mpmath[i] = mpmath.ei(x)
 
 ei_diff = np.abs(ei_expint - ei_mpmath)/np.abs(ei_mpmath)
@@ -1,12 +1,79 @@
-def get_bem_solution(nl, xv, yv):
-    """Using 4*nl elements, provides the solution for given points."""
-    
-    # Pre-processing.
-    xb, yb, bt, bv = define_boundary(nl)
-    xm, ym, lm, nx, ny = elements_properties(xb, yb)
-
-    # Processing.
-    u, q = solve_bem(xb, yb, bt, bv, xm, ym, lm, nx, ny)
+from collections import OrderedDict
+
+class SolutionCache:
+    """Bounded LRU cache of elements geometry and boundary solutions.
+
+    Parameters
+    ----------
+    maxsize : int, default=16
+        Maximum number of cached boundary solutions.
+
+    Attributes
+    ----------
+    hits : int
+        Number of lookups that found a cached boundary solution.
+    misses : int
+        Number of lookups that did not find a cached boundary solution.
+    """
+
+    def __init__(self, maxsize=16):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        if key in self._entries:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+        self.misses += 1
+        return None
+
+    def put(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def info(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'size': len(self._entries),
+            'maxsize': self.maxsize,
+        }
+
+solution_cache = SolutionCache()
+
+def get_bem_solution(nl, xv, yv, cache=solution_cache):
+    """Using 4*nl elements, provides the solution for given points.
+
+    Elements geometry and boundary solution are cached by nl, so that
+    define_boundary and the solver only run on cache misses, and repeated
+    calls only evaluate the domain values. Each call is one cache hit or miss.
+    """
+
+    entry = cache.get(nl)
+
+    if entry is None:
+        # Pre-processing.
+        xb, yb, bt, bv = define_boundary(nl)
+        xm, ym, lm, nx, ny = compute_elements_properties(xb, yb)
+
+        # Processing.
+        u, q = solve_bem(xb, yb, bt, bv, xm, ym, lm, nx, ny)
+
+        entry = (xb, yb, nx, ny, lm, u, q)
+        cache.put(nl, entry)
+
+    xb, yb, nx, ny, lm, u, q = entry
 
     # Post-processing.
     s = get_domain_values(u, q, xv, yv, xb, yb, nx, ny, lm)
@@ -1,4 +1,70 @@
 import numpy as np
+from scipy.linalg import lu_factor, lu_solve
+
+class BemSystem:
+    """Factorized system of equations for a fixed boundary and boundary condition types.
+
+    The influence matrices F and G are built once and the matrix A is
+    LU-factorized once, so that any number of boundary condition values can be
+    solved with triangular solves only.
+
+    Parameters
+    ----------
+    xb : numpy.ndarray[float]
+        X coordinate of boundary node points.
+    yb : numpy.ndarray[float]
+        Y coordinate of boundary node points.
+    bt : numpy.ndarray[int]
+        Boundary condition type by element.
+    xm, ym, lm, nx, ny : numpy.ndarray[float]
+        Elements properties, as returned by compute_elements_properties.
+    """
+
+    def __init__(self, xb, yb, bt, xm, ym, lm, nx, ny):
+        n = len(xb) - 1
+        I = np.eye(n)
+        F, G = findfg_array(xm, ym, xb[:-1], yb[:-1], nx, ny, lm)
+
+        self.dirichlet = bt == 0
+        neumann = ~self.dirichlet
+
+        A = np.empty((n, n))
+        A[:, self.dirichlet] = -F[:, self.dirichlet]
+        A[:, neumann] = G[:, neumann] - 0.5*I[:, neumann]
+
+        # Matrix that maps boundary condition values to the right-hand side.
+        self.B = np.empty((n, n))
+        self.B[:, self.dirichlet] = -G[:, self.dirichlet] + 0.5*I[:, self.dirichlet]
+        self.B[:, neumann] = F[:, neumann]
+
+        self.lu = lu_factor(A)
+
+    def solve(self, bv):
+        """Solve system of equations for given boundary condition values.
+
+        Parameters
+        ----------
+        bv : numpy.ndarray[float]
+            Boundary condition value by element, with shape (n,) or (n, m) for
+            m sets of boundary condition values.
+
+        Returns
+        -------
+        u : numpy.ndarray[float]
+            Function at the boundaries.
+        q : numpy.ndarray[float]
+            Derivative at the boundaries.
+        """
+
+        bv = np.asarray(bv, dtype=np.float64)
+        z = lu_solve(self.lu, self.B @ bv)
+
+        # Assign approximate boundary values accordingly.
+        d = self.dirichlet if bv.ndim == 1 else self.dirichlet[:, np.newaxis]
+        u = np.where(d, bv, z)
+        q = np.where(d, z, bv)
+
+        return u, q
 
 def solve_bem(xb, yb, bt, bv, xm, ym, lm, nx, ny):
     """Build and solve system of equations.
@@ -11,31 +77,6 @@ def solve_bem(xb, yb, bt, bv, xm, ym, lm, nx, ny):
         Derivative at the boundaries.
     """
 
-    n = len(xb) - 1
-    b = np.zeros(n)
-    A = np.zeros((n,n))
-    for m in range(n):
-        for k in range(n):
-            if k == m:
-                G = 0.0
-                F = lm[k]/(2.0*np.pi) * (np.log(lm[k]/2.0) - 1.0)
-                d = 1.0
-            else:
-                F, G = findfg(xm[m], ym[m], xb[k], yb[k], nx[k], ny[k], lm[k])
-                d = 0.0
-            if bt[k] == 0:
-                A[m, k] = -F
-                b[m] = b[m] + bv[k]*(-G + 0.5*d)
-            else:
-                A[m, k] = G - 0.5*d
-                b[m] = b[m] + bv[k]*F
-    
-    z = np.linalg.solve(A, b)
-    
-    # Assign approximate boundary values accordingly.
-    u, q = [np.empty(n) for _ in range(2)]
-    for m in range(n):
-        u[m] = (1 - bt[m])*bv[m] + bt[m]*z[m]
-        q[m] = (1 - bt[m])*z[m] + bt[m]*bv[m]
-
-    return u, q
+    system = BemSystem(xb, yb, bt, xm, ym, lm, nx, ny)
+
+    return system.solve(bv)
@@ -0,0 +1,150 @@
+import numpy as np
+from time import perf_counter
+from concurrent.futures import ProcessPoolExecutor
+
+# Nominal order of convergence of constant elements, used in the Richardson
+# extrapolation when the observed order is not finite and positive.
+nominal_order = 1.0
+
+def exact_solution(x, y):
+    """Analytical solution of the problem defined in define_boundary."""
+
+    return np.sinh(np.pi*x) * np.cos(np.pi*y) / np.sinh(np.pi)
+
+def run_level(nl, xv, yv):
+    """Using 4*nl elements, provides the solution and the time spent on each phase.
+
+    Returns
+    -------
+    s : numpy.ndarray[float]
+        Solution with shape (len(yv), len(xv)).
+    times : dict[str, float]
+        Wall time in seconds of phases boundary, properties, solve and domain.
+    """
+
+    times = {}
+
+    t0 = perf_counter()
+    xb, yb, bt, bv = define_boundary(nl)
+    t1 = perf_counter()
+    xm, ym, lm, nx, ny = compute_elements_properties(xb, yb)
+    t2 = perf_counter()
+    u, q = solve_bem(xb, yb, bt, bv, xm, ym, lm, nx, ny)
+    t3 = perf_counter()
+    s = get_domain_values(u, q, xv, yv, xb, yb, nx, ny, lm)
+    t4 = perf_counter()
+
+    times['boundary'] = t1 - t0
+    times['properties'] = t2 - t1
+    times['solve'] = t3 - t2
+    times['domain'] = t4 - t3
+
+    return s, times
+
+def convergence_sweep(nlv, xv, yv, tol=None, workers=None, order=None):
+    """Run a mesh-convergence study over a ladder of nl values.
+
+    Levels are run concurrently in a process pool, largest nl first, or
+    serially if workers is 0. The observed order of convergence is computed
+    from the maximum absolute error of consecutive levels, with element size
+    h = 1/nl, and the two finest levels are combined by Richardson
+    extrapolation.
+
+    Parameters
+    ----------
+    nlv : array_like[int]
+        Numbers of elements per side.
+    xv : numpy.ndarray[float]
+        X coordinate of evaluation points.
+    yv : numpy.ndarray[float]
+        Y coordinate of evaluation points.
+    tol : float, default=None
+        Error tolerance used to pick the cheapest nl.
+    workers : int, default=None
+        Number of worker processes. Defaults to the number of processors. With
+        0, levels are run serially in this process. Workers call run_level, so
+        define_boundary, compute_elements_properties, solve_bem and
+        get_domain_values must be importable by them, which is not the case
+        for functions defined in a notebook with the spawn start method
+        (Windows and macOS); use workers=0 there.
+    order : float, default=None
+        Order of convergence of the Richardson extrapolation. Defaults to the
+        observed order of the two finest levels, or nominal_order if that
+        order is not finite and positive.
+
+    Returns
+    -------
+    sweep : dict
+        nl : numpy.ndarray[int]
+            Sorted numbers of elements per side.
+        solutions : numpy.ndarray[float]
+            Solution of each level, with shape (len(nl), len(yv), len(xv)).
+        times : dict[str, numpy.ndarray[float]]
+            Wall time of each phase by level.
+        errors : numpy.ndarray[float]
+            Maximum absolute error against the analytical solution by level.
+        orders : numpy.ndarray[float]
+            Observed order of convergence between consecutive levels.
+        richardson : numpy.ndarray[float]
+            Richardson-extrapolated solution of the two finest levels.
+        richardson_order : float
+            Order of convergence used in the extrapolation.
+        richardson_error : float
+            Maximum absolute error of the Richardson-extrapolated solution.
+        nl_tol : int or None
+            Smallest nl whose error is not larger than tol.
+    """
+
+    nl = np.unique(np.asarray(nlv, dtype=int))
+    if len(nl) < 2:
+        raise ValueError("At least two distinct nl values are required")
+
+    if workers == 0:
+        results = [run_level(n, xv, yv) for n in nl]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                n: executor.submit(run_level, n, xv, yv) for n in nl[::-1]
+            }
+            results = [futures[n].result() for n in nl]
+
+    solutions = np.array([s for s, _ in results])
+    times = {
+        phase: np.array([t[phase] for _, t in results])
+        for phase in results[0][1]
+    }
+
+    xx, yy = np.meshgrid(xv, yv)
+    ua = exact_solution(xx, yy)
+    errors = np.max(np.abs(solutions - ua), axis=(1, 2))
+
+    # Observed order of convergence, with h = 1/nl.
+    orders = np.log(errors[:-1] / errors[1:]) / np.log(nl[1:] / nl[:-1])
+
+    # Richardson extrapolation of the two finest levels.
+    r = nl[-1] / nl[-2]
+    p = orders[-1] if order is None else order
+    if not (np.isfinite(p) and p > 0.0):
+        p = nominal_order
+    richardson = solutions[-1] + (solutions[-1] - solutions[-2]) / (r**p - 1.0)
+    richardson_error = np.max(np.abs(richardson - ua))
+
+    nl_tol = None
+    if tol is not None:
+        meets_tol = errors <= tol
+        if np.any(meets_tol):
+            nl_tol = int(nl[meets_tol][0])
+
+    sweep = {
+        'nl': nl,
+        'solutions': solutions,
+        'times': times,
+        'errors': errors,
+        'orders': orders,
+        'richardson': richardson,
+        'richardson_order': p,
+        'richardson_error': richardson_error,
+        'nl_tol': nl_tol,
+    }
+
+    return sweep
@@ -1,14 +1,64 @@
 import numpy as np
+from concurrent.futures import ProcessPoolExecutor
 
-def get_domain_values(u, q, xv, yv, xb, yb, nx, ny, lm):
-    """Find solution in any part of the domain."""
+def get_tile_values(u, q, x, y, xb, yb, nx, ny, lm):
+    """Find solution for a tile of points, given by flat arrays x and y."""
+
+    F, G = findfg_array(x, y, xb[:-1], yb[:-1], nx, ny, lm)
+
+    return G @ u - F @ q
+
+def get_domain_values(u, q, xv, yv, xb, yb, nx, ny, lm, memory=2**27, workers=None, out=None):
+    """Find solution in any part of the domain.
+
+    The meshgrid of xv and yv is processed in tiles, whose number of points is
+    bounded by the memory budget for the (points, elements) arrays of each tile.
+
+    Parameters
+    ----------
+    memory : int, default=2**27
+        Memory budget in bytes for the evaluation of one tile.
+    workers : int, default=None
+        Number of worker processes. Tiles are evaluated serially if None.
+    out : numpy.ndarray[float], default=None
+        Preallocated, possibly memory-mapped, output array with shape
+        (len(yv), len(xv)).
+
+    Returns
+    -------
+    s : numpy.ndarray[float]
+        Solution with shape (len(yv), len(xv)).
+    """
 
     n = len(xb) - 1
-    s = np.zeros((len(yv), len(xv)))  # To match numpy.meshgrid's default indexing.
-    for j, y in enumerate(yv):
-        for i, x in enumerate(xv):
-            for k in range(n):
-                [F, G] = findfg(x, y, xb[k], yb[k], nx[k], ny[k], lm[k])
-                s[j, i] = s[j, i] + u[k]*G - q[k]*F
+    ny_, nx_ = len(yv), len(xv)
+    s = np.zeros((ny_, nx_)) if out is None else out  # To match numpy.meshgrid's default indexing.
+
+    # About 16 temporary (points, elements) float arrays are created in findfg_array.
+    tile_points = max(1, memory // (16 * 8 * n))
+    tile_cols = min(nx_, tile_points)
+    tile_rows = max(1, tile_points // tile_cols)
+
+    tiles = []
+    for j in range(0, ny_, tile_rows):
+        for i in range(0, nx_, tile_cols):
+            rows = slice(j, min(j + tile_rows, ny_))
+            cols = slice(i, min(i + tile_cols, nx_))
+            x, y = np.meshgrid(xv[cols], yv[rows])
+            tiles.append((rows, cols, x.ravel(), y.ravel()))
+
+    if workers is None:
+        for rows, cols, x, y in tiles:
+            st = get_tile_values(u, q, x, y, xb, yb, nx, ny, lm)
+            s[rows, cols] = st.reshape(rows.stop - rows.start, cols.stop - cols.start)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(get_tile_values, u, q, x, y, xb, yb, nx, ny, lm)
+                for _, _, x, y in tiles
+            ]
+            for (rows, cols, _, _), future in zip(tiles, futures):
+                st = future.result()
+                s[rows, cols] = st.reshape(rows.stop - rows.start, cols.stop - cols.start)
 
     return s
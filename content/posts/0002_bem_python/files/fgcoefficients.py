@@ -18,3 +18,64 @@ def findfg(xi, eta, xk, yk, nkx, nky, lk):
     G = (lk/(2.0*np.pi)) * quad(lambda t: intg(t, xi, eta, xk, yk, nkx, nky, lk), 0, 1, epsabs=1e-8)[0]
 
     return F, G
+
+def findfg_array(xi, eta, xk, yk, nkx, nky, lk):
+    """Functions F and G for arrays of field points and elements.
+
+    F and G are integrated analytically in the local system of each element,
+    whose origin is the element midpoint and whose axes are the element tangent
+    (-nky, nkx) and normal (nkx, nky).
+
+    Parameters
+    ----------
+    xi : numpy.ndarray[float]
+        X coordinate of M field points.
+    eta : numpy.ndarray[float]
+        Y coordinate of M field points.
+    xk : numpy.ndarray[float]
+        X coordinate of the first node of N elements.
+    yk : numpy.ndarray[float]
+        Y coordinate of the first node of N elements.
+    nkx : numpy.ndarray[float]
+        X component of N elements normal vectors.
+    nky : numpy.ndarray[float]
+        Y component of N elements normal vectors.
+    lk : numpy.ndarray[float]
+        Length of N elements.
+
+    Returns
+    -------
+    F : numpy.ndarray[float]
+        Function F with shape (M, N).
+    G : numpy.ndarray[float]
+        Function G with shape (M, N).
+    """
+
+    xi = np.atleast_1d(xi)[:, np.newaxis]
+    eta = np.atleast_1d(eta)[:, np.newaxis]
+    eps = np.finfo(np.float64).eps
+
+    # Field points' local coordinates.
+    a = 0.5*lk
+    dx = xi - (xk - a*nky)
+    dy = eta - (yk + a*nkx)
+    x = -dx*nky + dy*nkx
+    y = dx*nkx + dy*nky
+
+    xma = x - a
+    xpa = x + a
+    r1 = xma**2 + y**2
+    r2 = xpa**2 + y**2
+    t1 = np.arctan2(y, xma)
+    t2 = np.arctan2(y, xpa)
+
+    # At the element end points, x*log(x) → 0 as x → 0.
+    r1 = np.where(r1 > 0.0, r1, 1.0)
+    r2 = np.where(r2 > 0.0, r2, 1.0)
+
+    F = (0.25/np.pi) * (2.0*y*(t1 - t2) - xma*np.log(r1) + xpa*np.log(r2) - 4.0*a)
+
+    # G is discontinuous in |x| < a and y = 0.
+    G = np.where(np.abs(y) <= lk*eps, 0.0, -(0.5/np.pi) * (t1 - t2))
+
+    return F, G
@@ -5,6 +5,37 @@ import numba
 
 eps = np.finfo(np.float64).eps
 
+
+@numba.njit(inline='always', cache=True)
+def _analytical_pair(x, y, element_length):
+    """Influence coefficients at a field point (x, y) in the element's local
+    coordinates, shared by the array kernels."""
+
+    a = 0.5 * element_length
+
+    if np.abs(y) <= element_length * eps \
+       and np.abs(np.abs(x) - a) <= element_length * eps:
+        return a / np.pi * (np.log(2*a) - 1), 0.0
+
+    xpa = x + a
+    xma = x - a
+
+    r1 = np.sqrt(xma**2 + y**2)
+    r2 = np.sqrt(xpa**2 + y**2)
+    t1 = np.arctan2(y, xma)
+    t2 = np.arctan2(y, xpa)
+
+    G = 0.5 / np.pi * (
+        y * (t1 - t2) - xma * np.log(r1) + xpa * np.log(r2) - 2 * a
+    )
+
+    if np.abs(y) <= element_length * eps:
+        # Q is discontinuous in |x| < a and y = 0.
+        return G, 0.0
+
+    return G, -0.5 / np.pi * (t1 - t2)
+
+
 class Element:
    
     @staticmethod
@@ -39,3 +70,67 @@ class Element:
                 Q = -0.5 / np.pi * (t1 - t2)
 
         return G, Q
+
+    @staticmethod
+    @numba.jit(
+        'Tuple((f8[:, :], f8[:, :]))(f8[:, :], f8[:])',
+        nopython=True,
+        parallel=True,
+        cache=True,
+    )
+    def _analytical_numba_array(field_local, element_length):
+        """Get influence coefficients for arrays of local field points and element lengths."""
+
+        m = field_local.shape[0]
+        n = element_length.shape[0]
+        G = np.empty((m, n))
+        Q = np.empty((m, n))
+
+        for i in numba.prange(m):
+            x = field_local[i, 0]
+            y = field_local[i, 1]
+            for j in range(n):
+                G[i, j], Q[i, j] = _analytical_pair(x, y, element_length[j])
+
+        return G, Q
+
+    @staticmethod
+    @numba.jit(
+        'Tuple((f8[:, :], f8[:, :]))(f8[:, :], f8[:, :, :])',
+        nopython=True,
+        parallel=True,
+        cache=True,
+    )
+    def _analytical_numba_global(field_global, endpoints):
+        """Get influence coefficients for arrays of global field points and element end points."""
+
+        m = field_global.shape[0]
+        n = endpoints.shape[0]
+        G = np.empty((m, n))
+        Q = np.empty((m, n))
+
+        # Elements' nodes, lengths, tangent and normal vectors.
+        node = np.empty((n, 2))
+        length = np.empty(n)
+        tangent = np.empty((n, 2))
+        for j in numba.prange(n):
+            rx = endpoints[j, 1, 0] - endpoints[j, 0, 0]
+            ry = endpoints[j, 1, 1] - endpoints[j, 0, 1]
+            length[j] = np.sqrt(rx**2 + ry**2)
+            tangent[j, 0] = rx / length[j]
+            tangent[j, 1] = ry / length[j]
+            node[j, 0] = 0.5 * (endpoints[j, 0, 0] + endpoints[j, 1, 0])
+            node[j, 1] = 0.5 * (endpoints[j, 0, 1] + endpoints[j, 1, 1])
+
+        for i in numba.prange(m):
+            for j in range(n):
+                dx = field_global[i, 0] - node[j, 0]
+                dy = field_global[i, 1] - node[j, 1]
+
+                # Field point's local coordinates, with normal = (ty, -tx).
+                x = dx * tangent[j, 0] + dy * tangent[j, 1]
+                y = dx * tangent[j, 1] - dy * tangent[j, 0]
+
+                G[i, j], Q[i, j] = _analytical_pair(x, y, length[j])
+
+        return G, Q
@@ -0,0 +1,382 @@
+"""Benchmark of the 2D constant boundary element influence coefficients back ends.
+
+The back ends compute the influence coefficients G and Q, as defined for the
+`Element` class, for arrays of global field points and element end points.
+
+Back ends
+---------
+quad : fgcoefficients.findfg, scipy.integrate.quad (0002 post).
+quad_array : fgcoefficients.findfg_array, closed form in NumPy (0002 post).
+analytical : Element._analytical_numba without compilation.
+analytical_numba : Element._analytical_numba.
+analytical_numba_array : Element._analytical_numba_global.
+analytical_fortran : incoef.analytical_fortran, if built with F2PY.
+gauss_fortran : incoef.gauss_fortran, if built with F2PY.
+
+The quad and quad_array back ends, and nothing else, use fgcoefficients.py of
+the 0002_bem_python post, which must be next to this post, as in the blog
+repository.
+
+Results are written in JSON format, so they can be compared across releases.
+"""
+
+import os
+import sys
+import json
+import platform
+import tempfile
+import subprocess
+from pathlib import Path
+from time import perf_counter, strftime
+
+import numpy as np
+import mpmath as mp
+
+files_dir = Path(__file__).resolve().parent
+sys.path.insert(0, str(files_dir))
+sys.path.insert(0, str(files_dir.parent))
+
+# Reference quadrature back ends of the 0002 post.
+fgcoefficients_dir = files_dir.parents[1] / '0002_bem_python' / 'files'
+sys.path.append(str(fgcoefficients_dir))
+
+import_times = {}
+
+t0 = perf_counter()
+try:
+    import fgcoefficients
+except ImportError as error:
+    raise ImportError(
+        f"benchmark.py requires fgcoefficients.py of the 0002 post in {fgcoefficients_dir}"
+    ) from error
+import_times['fgcoefficients'] = perf_counter() - t0
+
+t0 = perf_counter()
+import numba
+from analytical_numba import Element
+import_times['analytical_numba'] = perf_counter() - t0
+
+try:
+    t0 = perf_counter()
+    import incoef
+    import_times['incoef'] = perf_counter() - t0
+except ImportError:
+    incoef = None
+
+
+def set_field_points(radius, num_points=1000, seed=18):
+    """Random field points in a circle around a unitary element on the x axis.
+
+    Points too close to the element are removed, as in element.ipynb.
+    """
+
+    rng = np.random.default_rng(seed)
+    r = radius * rng.uniform(0, 1, num_points)
+    t = rng.uniform(0, 2*np.pi, num_points)
+    field_points = np.column_stack((r * np.cos(t), r * np.sin(t)))
+    endpoints = np.array([[[-0.5, 0.0], [0.5, 0.0]]])
+
+    x, y, _ = local_coordinates(field_points, endpoints)
+    distance = np.where(np.abs(x) <= 0.5, np.abs(y), np.hypot(np.abs(x) - 0.5, y))
+    too_close = distance[:, 0] <= np.finfo(np.float64).eps
+
+    return field_points[~too_close], endpoints
+
+
+def set_mesh(number_of_elements, num_points=100, seed=18):
+    """Unit circle meshed with N elements and random field points around it."""
+
+    t = np.linspace(0.0, 2*np.pi, number_of_elements + 1)
+    vertices = np.column_stack((np.cos(t), np.sin(t)))
+    endpoints = np.stack((vertices[:-1], vertices[1:]), axis=1)
+
+    rng = np.random.default_rng(seed)
+    r = 2.0 * rng.uniform(0, 1, num_points)
+    t = rng.uniform(0, 2*np.pi, num_points)
+    field_points = np.column_stack((r * np.cos(t), r * np.sin(t)))
+
+    return field_points, endpoints
+
+
+def local_coordinates(field_global, endpoints):
+    """Field points' local coordinates with respect to each element.
+
+    Returns
+    -------
+    x : numpy.ndarray
+        Local x coordinates with shape (M, N).
+    y : numpy.ndarray
+        Local y coordinates with shape (M, N).
+    length : numpy.ndarray
+        Elements' lengths with shape (N,).
+    """
+
+    r = endpoints[:, 1] - endpoints[:, 0]
+    length = np.linalg.norm(r, axis=1)
+    tangent = r / length[:, np.newaxis]
+    node = endpoints.mean(axis=1)
+
+    dif = field_global[:, np.newaxis, :] - node
+    x = dif[..., 0] * tangent[:, 0] + dif[..., 1] * tangent[:, 1]
+    y = dif[..., 0] * tangent[:, 1] - dif[..., 1] * tangent[:, 0]
+
+    return x, y, length
+
+
+def scalar_backend(func):
+    """Matrix back end from a scalar function of (field_local, element_length)."""
+
+    def backend(field_global, endpoints):
+        x, y, length = local_coordinates(field_global, endpoints)
+        G = np.empty(x.shape)
+        Q = np.empty(x.shape)
+        for i in range(x.shape[0]):
+            for j in range(x.shape[1]):
+                G[i, j], Q[i, j] = func(np.array([x[i, j], y[i, j]]), length[j])
+
+        return G, Q
+
+    return backend
+
+
+def quad(field_global, endpoints):
+    xk, yk = endpoints[:, 0, 0], endpoints[:, 0, 1]
+    r = endpoints[:, 1] - endpoints[:, 0]
+    lk = np.linalg.norm(r, axis=1)
+    nkx = r[:, 1] / lk
+    nky = -r[:, 0] / lk
+
+    G = np.empty((len(field_global), len(endpoints)))
+    Q = np.empty((len(field_global), len(endpoints)))
+    for i, (xi, eta) in enumerate(field_global):
+        for j in range(len(endpoints)):
+            # F and G of the 0002 post are G and Q of the Element class.
+            G[i, j], Q[i, j] = fgcoefficients.findfg(xi, eta, xk[j], yk[j], nkx[j], nky[j], lk[j])
+
+    return G, Q
+
+
+def quad_array(field_global, endpoints):
+    xk, yk = endpoints[:, 0, 0], endpoints[:, 0, 1]
+    r = endpoints[:, 1] - endpoints[:, 0]
+    lk = np.linalg.norm(r, axis=1)
+
+    return fgcoefficients.findfg_array(
+        field_global[:, 0], field_global[:, 1], xk, yk, r[:, 1] / lk, -r[:, 0] / lk, lk
+    )
+
+
+def analytical_numba_array(field_global, endpoints):
+    return Element._analytical_numba_global(
+        np.ascontiguousarray(field_global, dtype=np.float64),
+        np.ascontiguousarray(endpoints, dtype=np.float64),
+    )
+
+
+backends = {
+    'quad': quad,
+    'quad_array': quad_array,
+    'analytical': scalar_backend(Element._analytical_numba.py_func),
+    'analytical_numba': scalar_backend(Element._analytical_numba),
+    'analytical_numba_array': analytical_numba_array,
+}
+
+if incoef is not None:
+    backends['analytical_fortran'] = scalar_backend(incoef.incoef.analytical_fortran)
+    backends['gauss_fortran'] = scalar_backend(incoef.incoef.gauss_fortran)
+
+# Back ends that evaluate one (field point, element) pair per Python call.
+scalar_backends = ['quad', 'analytical', 'analytical_numba', 'analytical_fortran', 'gauss_fortran']
+
+
+def reference(field_global, endpoints, dps=30):
+    """High precision G and Q, integrated with mpmath."""
+
+    x, y, length = local_coordinates(field_global, endpoints)
+    G = np.empty(x.shape)
+    Q = np.empty(x.shape)
+
+    with mp.workdps(dps):
+        for i in range(x.shape[0]):
+            for j in range(x.shape[1]):
+                a = mp.mpf(length[j]) / 2
+                xi = mp.mpf(x[i, j])
+                yi = mp.mpf(y[i, j])
+
+                # Split the integration interval at the projection of the field point.
+                points = [-a, a] if abs(xi) >= a else [-a, xi, a]
+                g = mp.quad(lambda t: mp.log((xi - t)**2 + yi**2), points)
+                q = mp.quad(lambda t: yi / ((xi - t)**2 + yi**2), points)
+
+                G[i, j] = float(g / (4*mp.pi))
+                Q[i, j] = float(-q / (2*mp.pi))
+
+    return G, Q
+
+
+# Run in a new interpreter by get_jit_times: imports analytical_numba and makes
+# the first call of each Numba back end.
+jit_script = """
+import json
+from time import perf_counter
+import numpy as np
+import numba
+
+field_points = np.array([[0.3, 0.4]])
+endpoints = np.array([[[-0.5, 0.0], [0.5, 0.0]]])
+
+t0 = perf_counter()
+from analytical_numba import Element
+t1 = perf_counter()
+Element._analytical_numba(field_points[0], 1.0)
+t2 = perf_counter()
+Element._analytical_numba_global(field_points, endpoints)
+t3 = perf_counter()
+
+print(json.dumps({
+    'import_time': t1 - t0,
+    'analytical_numba': t2 - t1,
+    'analytical_numba_array': t3 - t2,
+}))
+"""
+
+
+def get_jit_times():
+    """Cold and cached JIT times of the Numba back ends.
+
+    The Numba functions have eager signatures and cache=True, so they are
+    compiled, or loaded from the cache, when analytical_numba is imported.
+    The import and first calls are timed in new interpreters with
+    NUMBA_CACHE_DIR set to an empty temporary directory: the first run
+    compiles (cold), and the second loads what the first one cached.
+
+    Returns
+    -------
+    jit_times : dict
+        'cold' and 'cached' import times and first call times.
+    """
+
+    jit_times = {}
+    with tempfile.TemporaryDirectory() as cache_dir:
+        env = {**os.environ, 'NUMBA_CACHE_DIR': cache_dir}
+        for name in ('cold', 'cached'):
+            output = subprocess.run(
+                [sys.executable, '-c', jit_script],
+                cwd=files_dir.parent,
+                env=env,
+                capture_output=True,
+                text=True,
+                check=True,
+            ).stdout
+            jit_times[name] = json.loads(output)
+
+    return jit_times
+
+
+def get_time(func, *args, number_of_loops=3):
+    """Minimum wall time of a function call."""
+
+    times = np.empty(number_of_loops)
+    for i in range(number_of_loops):
+        start_time = perf_counter()
+        func(*args)
+        times[i] = perf_counter() - start_time
+
+    return times.min()
+
+
+def run_benchmarks(
+    filename='benchmark.json',
+    radii=(1.0, 10.0),
+    num_points=500,
+    number_of_elements=(100, 1000, 10000),
+    max_pairs=20000,
+):
+    """Run all benchmarks and write results to a JSON file.
+
+    Parameters
+    ----------
+    filename : str, default='benchmark.json'
+        Output JSON file.
+    radii : tuple[float], default=(1.0, 10.0)
+        Radii of the field points layouts around a unitary element.
+    num_points : int, default=500
+        Number of field points of each layout.
+    number_of_elements : tuple[int], default=(100, 1000, 10000)
+        Number of elements N for throughput measurements.
+    max_pairs : int, default=20000
+        Maximum number of (field point, element) pairs evaluated by scalar back
+        ends in throughput measurements. At least one field point is evaluated.
+
+    Returns
+    -------
+    results : dict
+        Benchmark results, as written to the JSON file.
+    """
+
+    results = {
+        'metadata': {
+            'date': strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'numba': numba.__version__,
+            'platform': platform.platform(),
+            'processor': platform.processor(),
+            'import_times': import_times,
+            'jit_times': get_jit_times(),
+        },
+        'backends': {name: {} for name in backends},
+    }
+
+    # First call after import versus warm call. The Numba functions have
+    # eager signatures, so they are compiled, or loaded from the cache, at
+    # import, and that cost is in import_times and jit_times, not in
+    # first_call_time.
+    field_points, endpoints = set_field_points(1.0, 10)
+    for name, backend in backends.items():
+        first_call = get_time(backend, field_points, endpoints, number_of_loops=1)
+        warm = get_time(backend, field_points, endpoints)
+        results['backends'][name]['first_call_time'] = first_call
+        results['backends'][name]['warm_time'] = warm
+
+    # Time per coefficient and maximum error against the reference.
+    for radius in radii:
+        field_points, endpoints = set_field_points(radius, num_points)
+        G_ref, Q_ref = reference(field_points, endpoints)
+        layout = f'radius_{radius:g}'
+
+        for name, backend in backends.items():
+            G, Q = backend(field_points, endpoints)
+            elapsed_time = get_time(backend, field_points, endpoints)
+            results['backends'][name][layout] = {
+                'number_of_points': len(field_points),
+                'time_per_coefficient': elapsed_time / G.size,
+                'max_error_G': np.abs(G - G_ref).max(),
+                'max_error_Q': np.abs(Q - Q_ref).max(),
+            }
+
+    # Throughput, in coefficients per second, for N elements.
+    for n in number_of_elements:
+        field_points, endpoints = set_mesh(n)
+
+        for name, backend in backends.items():
+            if name in scalar_backends:
+                m = max(1, max_pairs // n)
+                points = field_points[:m]
+            else:
+                points = field_points
+
+            elapsed_time = get_time(backend, points, endpoints, number_of_loops=1)
+            results['backends'][name][f'throughput_{n}'] = {
+                'number_of_pairs': len(points) * n,
+                'coefficients_per_second': len(points) * n / elapsed_time,
+            }
+
+    with open(filename, 'w') as f:
+        json.dump(results, f, indent=2, default=float)
+
+    return results
+
+
+if __name__ == '__main__':
+    run_benchmarks()
@@ -0,0 +1,417 @@
+import numpy as np
+from scipy.linalg import toeplitz, hankel
+
+eps = np.finfo(np.float64).eps
+
+
+def local_coordinates(points, starts, ends):
+    """Points' coordinates in the local system of elements, pair by pair.
+
+    The origin is the element midpoint, x is along the element and y is along
+    the normal (ty, -tx). The element half-length a is also returned.
+    """
+
+    r = ends - starts
+    length = np.linalg.norm(r, axis=-1)
+    tx = r[..., 0] / length
+    ty = r[..., 1] / length
+    dif = points - 0.5*(starts + ends)
+
+    x = dif[..., 0]*tx + dif[..., 1]*ty
+    y = dif[..., 0]*ty - dif[..., 1]*tx
+
+    return x, y, 0.5*length
+
+
+def laplace_kernel_g(points, starts, ends):
+    """Integral of the Green's function (1/2π) ln r over elements, pair by pair.
+
+    Parameters are as in laplace_kernel.
+    """
+
+    x, y, a = local_coordinates(points, starts, ends)
+    xma = x - a
+    xpa = x + a
+    r1 = xma**2 + y**2
+    r2 = xpa**2 + y**2
+    t1 = np.arctan2(y, xma)
+    t2 = np.arctan2(y, xpa)
+
+    # At the element end points, x*log(x) → 0 as x → 0.
+    r1 = np.where(r1 > 0.0, r1, 1.0)
+    r2 = np.where(r2 > 0.0, r2, 1.0)
+
+    return 0.25 / np.pi * (2*y*(t1 - t2) - xma*np.log(r1) + xpa*np.log(r2) - 4*a)
+
+
+def laplace_kernel_q(points, starts, ends):
+    """Integral of the Green's function normal derivative over elements, pair
+    by pair.
+
+    Parameters are as in laplace_kernel.
+    """
+
+    x, y, a = local_coordinates(points, starts, ends)
+    t1 = np.arctan2(y, x - a)
+    t2 = np.arctan2(y, x + a)
+
+    # Q is discontinuous in |x| < a and y = 0.
+    return np.where(np.abs(y) <= 2*a*eps, 0.0, -0.5 / np.pi * (t1 - t2))
+
+
+def laplace_kernel(points, starts, ends):
+    """Laplace influence coefficients of elements at points, pair by pair.
+
+    Parameters
+    ----------
+    points : numpy.ndarray
+        Field points' coordinates with shape (..., 2).
+    starts : numpy.ndarray
+        Elements' first end points with shape (..., 2).
+    ends : numpy.ndarray
+        Elements' second end points with shape (..., 2).
+
+    Returns
+    -------
+    G : numpy.ndarray
+        Integral of the Green's function (1/2π) ln r over the element.
+    Q : numpy.ndarray
+        Integral of the Green's function normal derivative over the element.
+    """
+
+    return laplace_kernel_g(points, starts, ends), laplace_kernel_q(points, starts, ends)
+
+
+def find_uniform_runs(vertices, rtol=1.0e-10):
+    """Find runs of consecutive collinear elements with equal lengths.
+
+    Parameters
+    ----------
+    vertices : numpy.ndarray
+        Closed boundary vertices with shape (n + 1, 2).
+
+    Returns
+    -------
+    runs : list[tuple[int]]
+        First and last + 1 element indices of each run.
+    """
+
+    d = np.diff(vertices, axis=0)
+    scale = np.abs(d).max()
+    same = np.all(np.abs(d[1:] - d[:-1]) <= rtol*scale, axis=1)
+
+    runs = []
+    start = 0
+    for i, s in enumerate(same):
+        if not s:
+            runs.append((start, i + 1))
+            start = i + 1
+    runs.append((start, len(d)))
+
+    return runs
+
+
+def aca(get_row, get_col, shape, tol, max_zero_crosses=8):
+    """Adaptive cross approximation with partial pivoting, A ≈ U @ V.
+
+    Influence blocks may have zero rows and columns, e.g. Q between collinear
+    elements. When the pivot row is zero, unused columns spread over the block
+    are searched for a nonzero entry to restart from.
+
+    Parameters
+    ----------
+    get_row : callable
+        Function that returns row i of the block.
+    get_col : callable
+        Function that returns column j of the block.
+    shape : tuple[int]
+        Block shape (m, n).
+    tol : float
+        Relative tolerance in the Frobenius norm.
+    max_zero_crosses : int, default=8
+        Number of zero rows and columns searched before the block is
+        considered fully approximated.
+
+    Returns
+    -------
+    U : numpy.ndarray
+        Left factor with shape (m, rank).
+    V : numpy.ndarray
+        Right factor with shape (rank, n).
+    """
+
+    m, n = shape
+    us = []
+    vs = []
+    used_rows = np.zeros(m, dtype=np.bool)
+    used_cols = np.zeros(n, dtype=np.bool)
+    norm2 = 0.0
+
+    def residual_row(i):
+        row = get_row(i)
+        for u, v in zip(us, vs):
+            row = row - u[i] * v
+        return row
+
+    def residual_col(j):
+        col = get_col(j)
+        for u, v in zip(us, vs):
+            col = col - v[j] * u
+        return col
+
+    def is_zero(a):
+        return np.abs(a).max() <= eps * np.sqrt(norm2)
+
+    def find_pivot_row():
+        """Unused row with a nonzero residual entry, or None."""
+
+        rows = np.flatnonzero(~used_rows)
+        cols = np.flatnonzero(~used_cols)
+        for k in range(max_zero_crosses):
+            if len(rows):
+                i = rows[(k * len(rows)) // max_zero_crosses]
+                row = residual_row(i)
+                used_rows[i] = True
+                if not is_zero(row):
+                    return i, row
+            if len(cols):
+                j = cols[(k * len(cols)) // max_zero_crosses]
+                col = residual_col(j)
+                used_cols[j] = True
+                col = np.where(used_rows, 0.0, col)
+                if not is_zero(col):
+                    i = np.argmax(np.abs(col))
+                    used_rows[i] = True
+                    return i, residual_row(i)
+        return None
+
+    i = 0
+    used_rows[i] = True
+    row = residual_row(i)
+
+    while len(us) < min(m, n):
+        if is_zero(row):
+            pivot = find_pivot_row()
+            if pivot is None:
+                break
+            i, row = pivot
+
+        j = np.argmax(np.abs(row))
+        used_cols[j] = True
+        v = row / row[j]
+        u = residual_col(j)
+
+        # Frobenius norm of the approximation, updated with the new cross.
+        uu = np.vdot(u, u).real
+        vv = np.vdot(v, v).real
+        norm2 += uu * vv + 2 * sum((np.vdot(uk, u) * np.vdot(vk, v)).real for uk, vk in zip(us, vs))
+        us.append(u)
+        vs.append(v)
+
+        if np.sqrt(uu * vv) <= tol * np.sqrt(norm2):
+            break
+
+        # Next pivot row: largest entry of u among unused rows.
+        candidates = np.where(used_rows, -1.0, np.abs(u))
+        i = np.argmax(candidates)
+        if used_rows[i]:
+            break
+        used_rows[i] = True
+        row = residual_row(i)
+
+    if not us:
+        return np.zeros((m, 0), dtype=row.dtype), np.zeros((0, n), dtype=row.dtype)
+
+    return np.column_stack(us), np.vstack(vs)
+
+
+class StructuredMatrix:
+    """Matrix assembled from Toeplitz, Hankel, low rank and dense blocks.
+
+    Parameters
+    ----------
+    shape : tuple[int]
+        Matrix shape.
+
+    Attributes
+    ----------
+    blocks : list[tuple]
+        Blocks (rows, cols, kind, data). For kind 'toeplitz', data is the
+        (first column, first row) pair. For kind 'hankel', data is the
+        (first column, last row) pair. For kind 'lowrank', data is the (U, V)
+        pair. For kind 'dense', data is the block.
+    """
+
+    def __init__(self, shape):
+        self.shape = shape
+        self.blocks = []
+
+    def add_block(self, rows, cols, kind, data):
+        self.blocks.append((rows, cols, kind, data))
+
+    def toarray(self):
+        A = np.empty(self.shape)
+        for rows, cols, kind, data in self.blocks:
+            if kind == 'toeplitz':
+                A[rows, cols] = toeplitz(*data)
+            elif kind == 'hankel':
+                A[rows, cols] = hankel(*data)
+            elif kind == 'lowrank':
+                A[rows, cols] = data[0] @ data[1]
+            else:
+                A[rows, cols] = data
+
+        return A
+
+    def matvec(self, x):
+        """Matrix-vector product, using FFTs for Toeplitz and Hankel blocks."""
+
+        y = np.zeros(self.shape[0], dtype=np.result_type(x, np.float64))
+        for rows, cols, kind, data in self.blocks:
+            if kind == 'toeplitz':
+                y[rows] += toeplitz_matvec(data[0], data[1], x[cols])
+            elif kind == 'hankel':
+                # A Hankel matrix is a Toeplitz matrix with reversed columns.
+                c, r = data
+                h = np.concatenate((c, r[1:]))
+                m = len(c)
+                n = len(r)
+                y[rows] += toeplitz_matvec(h[n-1:n-1+m], h[n-1::-1], x[cols][::-1])
+            elif kind == 'lowrank':
+                y[rows] += data[0] @ (data[1] @ x[cols])
+            else:
+                y[rows] += data @ x[cols]
+
+        return y
+
+    def __matmul__(self, x):
+        return self.matvec(x)
+
+
+def toeplitz_matvec(c, r, x):
+    """Toeplitz matrix-vector product by circulant embedding."""
+
+    m = len(c)
+    n = len(r)
+    circulant = np.concatenate((c, r[:0:-1]))
+    xp = np.concatenate((x, np.zeros(m - 1)))
+    y = np.fft.ifft(np.fft.fft(circulant) * np.fft.fft(xp))[:m]
+
+    return y if np.iscomplexobj(x) else y.real
+
+
+def build_lowrank_block(kernel, points, starts, ends, tol):
+    """Block of a kernel by adaptive cross approximation.
+
+    Returns
+    -------
+    kind : str
+        'lowrank' if the (U, V) pair stores fewer entries than the block,
+        otherwise 'dense'.
+    data : tuple[numpy.ndarray] or numpy.ndarray
+        (U, V) pair or dense block.
+    evaluations : int
+        Number of (point, element) kernel evaluations.
+    """
+
+    m = len(points)
+    n = len(starts)
+    evaluations = 0
+
+    def get_row(i):
+        nonlocal evaluations
+        evaluations += n
+        return kernel(points[i], starts, ends)
+
+    def get_col(j):
+        nonlocal evaluations
+        evaluations += m
+        return kernel(points, starts[j], ends[j])
+
+    U, V = aca(get_row, get_col, (m, n), tol)
+
+    if U.shape[1] * (m + n) < m * n:
+        return 'lowrank', (U, V), evaluations
+
+    return 'dense', U @ V, evaluations
+
+
+def build_structured_influence_matrices(vertices, rtol=1.0e-10, tol=1.0e-10):
+    """Build influence matrices G and Q of a closed polygon with uniform sides.
+
+    Collocation points are the element midpoints. For a pair of uniform runs
+    with equal element vectors, each block is Toeplitz, and for opposite element
+    vectors it is Hankel, so only one generating row and column are evaluated.
+    Other blocks, such as between perpendicular sides, are compressed with
+    adaptive cross approximation, separately for G and Q, whose cost is the
+    rank times the block's rows and columns. The cost of the assembly is then
+    proportional to n times the ranks, which grow slowly with n, instead of
+    n². The -1/2 diagonal jump of Q is not included.
+
+    Parameters
+    ----------
+    vertices : numpy.ndarray
+        Closed boundary vertices with shape (n + 1, 2).
+    rtol : float, default=1e-10
+        Relative tolerance of equal element vectors.
+    tol : float, default=1e-10
+        Relative tolerance of the low rank blocks.
+
+    Returns
+    -------
+    G : StructuredMatrix
+        Integral of the Green's function over the elements.
+    Q : StructuredMatrix
+        Integral of the Green's function normal derivative over the elements.
+    kernel_evaluations : dict
+        Number of (point, element) evaluations of the G and Q kernels.
+    """
+
+    n = len(vertices) - 1
+    starts = vertices[:-1]
+    ends = vertices[1:]
+    midpoints = 0.5*(starts + ends)
+    d = ends - starts
+    scale = np.abs(d).max()
+
+    runs = find_uniform_runs(vertices, rtol)
+    G = StructuredMatrix((n, n))
+    Q = StructuredMatrix((n, n))
+    kernel_evaluations = {'G': 0, 'Q': 0}
+
+    for i0, i1 in runs:
+        for j0, j1 in runs:
+            rows = slice(i0, i1)
+            cols = slice(j0, j1)
+            di = d[i0]
+            dj = d[j0]
+
+            if np.all(np.abs(di - dj) <= rtol*scale):
+                # Depends on i - j: first column and first row.
+                ii = np.concatenate((np.arange(i0, i1), np.full(j1 - j0 - 1, i0)))
+                jj = np.concatenate((np.full(i1 - i0, j0), np.arange(j0 + 1, j1)))
+                g, q = laplace_kernel(midpoints[ii], starts[jj], ends[jj])
+                m = i1 - i0
+                G.add_block(rows, cols, 'toeplitz', (g[:m], np.concatenate((g[:1], g[m:]))))
+                Q.add_block(rows, cols, 'toeplitz', (q[:m], np.concatenate((q[:1], q[m:]))))
+            elif np.all(np.abs(di + dj) <= rtol*scale):
+                # Depends on i + j: first column and last row.
+                ii = np.concatenate((np.arange(i0, i1), np.full(j1 - j0 - 1, i1 - 1)))
+                jj = np.concatenate((np.full(i1 - i0, j0), np.arange(j0 + 1, j1)))
+                g, q = laplace_kernel(midpoints[ii], starts[jj], ends[jj])
+                m = i1 - i0
+                G.add_block(rows, cols, 'hankel', (g[:m], np.concatenate((g[m-1:m], g[m:]))))
+                Q.add_block(rows, cols, 'hankel', (q[:m], np.concatenate((q[m-1:m], q[m:]))))
+            else:
+                for H, name, kernel in ((G, 'G', laplace_kernel_g), (Q, 'Q', laplace_kernel_q)):
+                    kind, data, evaluations = build_lowrank_block(
+                        kernel, midpoints[rows], starts[cols], ends[cols], tol
+                    )
+                    H.add_block(rows, cols, kind, data)
+                    kernel_evaluations[name] += evaluations
+                continue
+
+            kernel_evaluations['G'] += len(g)
+            kernel_evaluations['Q'] += len(q)
+
+    return G, Q, kernel_evaluations
@@ -1,6 +1,9 @@
 import numpy as np
+from scipy.linalg import lu_factor, lu_solve
+from scipy.sparse.linalg import eigs
 from twodubem.solver import Solver
 from twodubem.laplace import Laplace
+from structured import build_structured_influence_matrices
 
 
 class SloshingSolver(Solver):
@@ -10,46 +13,80 @@ class SloshingSolver(Solver):
     ----------
     tank : Polygon
         Boundary that represents the tank.
+    assembly : str, default='dense'
+        Assembly of influence matrices. Two methods are available: 'dense',
+        with one kernel evaluation per element pair, and 'structured', with
+        Toeplitz and Hankel blocks for uniformly meshed straight sides and low
+        rank blocks between the remaining sides.
     """
 
-    def __init__(self, tank):
+    def __init__(self, tank, assembly='dense'):
         self.boundary = tank
         self.green = Laplace()
         self.method = 'constant'
         self.g = 9.81
+        self.assembly = assembly.strip().lower()
 
-    def solve_eigenvalue_problem(self):
+    def _build_influence_matrices(self):
+        if self.assembly == 'dense':
+            super()._build_influence_matrices()
+        elif self.assembly == 'structured':
+            G, Q, self.kernel_evaluations = build_structured_influence_matrices(
+                self.boundary.vertices
+            )
+            self.G = G.toarray()
+            self.Q = Q.toarray() - 0.5*np.eye(self.boundary.number_of_elements)
+        else:
+            raise ValueError(f"Invalid assembly method: {self.assembly}")
+
+    def solve_eigenvalue_problem(self, number_of_modes=None):
         """Solve the eigenvalue problem.
         
         The solution of the eigenvalue problem returns natural sloshing frequencies and modes.
+
+        Parameters
+        ----------
+        number_of_modes : int, default=None
+            Number of lowest sloshing modes to compute with a shift-invert
+            eigensolver. All modes are computed with a dense eigensolver if None.
         """
 
-        self._build_influence_matrices()
+        if not hasattr(self, 'G') or not hasattr(self, 'Q'):
+            self._build_influence_matrices()
         
         n = self.boundary.number_of_elements
         nf = self.boundary.number_of_free_surface_elements
         nr = n - nf
         A = np.empty((n, n), dtype=np.float64)
-        B = np.empty((n, n), dtype=np.float64)
 
         A[:, :nr] =  self.Q[:, :nr]
         A[:, nr:] = -self.G[:, nr:]
-        B[:, :nr] =  self.G[:, :nr]
-        B[:, nr:] = -self.Q[:, nr:]
 
-        C = np.zeros_like(B)
-        C[nr:, nr:] = np.eye(nf)
+        # Only the free surface columns of B remain after the product B @ C,
+        # so A is solved for these nf columns instead of being inverted.
+        Bf = -self.Q[:, nr:]
+        T1 = lu_solve(lu_factor(A), Bf)[nr:]
 
-        R = B @ C
+        if number_of_modes is None or number_of_modes + 1 >= nf - 1:
+            s, q = np.linalg.eig(T1)
+        else:
+            # The lowest eigenvalue is zero. A small negative shift keeps T1 - sigma*I regular.
+            sigma = -1.0e-8 * np.linalg.norm(T1, 1)
+            s, q = eigs(T1, k=number_of_modes+1, sigma=sigma)
 
-        T = np.linalg.inv(A) @ R
-        T1 = T[nr:, nr:]
-
-        s, q = np.linalg.eig(T1)
+            # Eigenvectors of real eigenvalues are real, up to a complex factor.
+            imax = np.argmax(np.abs(q), axis=0)
+            phase = q[imax, np.arange(q.shape[1])]
+            s = s.real
+            q = (q * (np.abs(phase) / phase)).real
 
         sorting_array = np.argsort(s)
         s_sorted = s[sorting_array]
         q_sorted = q[:, sorting_array]
         
         self.natural_frequencies = np.sqrt(self.g * s_sorted[1:])
-        self.natural_modes = q_sorted[:, 1:]
\ No newline at end of file
+        self.natural_modes = q_sorted[:, 1:]
+
+        if number_of_modes is not None:
+            self.natural_frequencies = self.natural_frequencies[:number_of_modes]
+            self.natural_modes = self.natural_modes[:, :number_of_modes]
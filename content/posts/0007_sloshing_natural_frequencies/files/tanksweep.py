@@ -0,0 +1,155 @@
+import numpy as np
+from itertools import product
+from concurrent.futures import ProcessPoolExecutor
+from tank import RectangularTank
+from tanksolver import SloshingSolver
+
+
+def real_part(a, name, rtol=1.0e-8):
+    """Real part of a, which must have a negligible imaginary part."""
+
+    if not np.iscomplexobj(a):
+        return a
+
+    if np.abs(a.imag).max(initial=0.0) > rtol * np.abs(a).max(initial=0.0):
+        raise ValueError(f"Sloshing {name} have non-negligible imaginary parts")
+
+    return a.real
+
+
+def solve_similar_tanks(aspect_ratio, element_counts, widths, number_of_modes):
+    """Solve the eigenvalue problem of geometrically similar tanks.
+
+    The influence matrices are built once for a tank of unitary width. Under a
+    uniform scaling by w, Q is unchanged and the Laplace kernel k*log(r) changes
+    G by a known log term: G_w = w * (G_1 + k*log(w) * lengths_1).
+
+    Parameters
+    ----------
+    aspect_ratio : float
+        Tank's depth to width ratio.
+    element_counts : tuple[int]
+        Number of width, depth and free surface elements.
+    widths : list[float]
+        Tanks' widths.
+    number_of_modes : int
+        Number of lowest sloshing modes.
+
+    Returns
+    -------
+    natural_frequencies : numpy.ndarray
+        Natural frequencies with shape (len(widths), number_of_modes).
+    natural_modes : numpy.ndarray
+        Natural modes with shape (len(widths), nz, number_of_modes).
+    """
+
+    reference_tank = RectangularTank(1.0, aspect_ratio, *element_counts)
+    reference = SloshingSolver(reference_tank)
+    reference._build_influence_matrices()
+    lengths = reference_tank.lengths
+
+    # Kernel factor k, from the self-influence G_ii = k * L * (log(L/2) - 1).
+    k = reference.G[0, 0] / (lengths[0] * (np.log(0.5*lengths[0]) - 1.0))
+
+    nz = reference_tank.number_of_free_surface_elements
+    natural_frequencies = np.empty((len(widths), number_of_modes))
+    natural_modes = np.empty((len(widths), nz, number_of_modes))
+
+    for i, w in enumerate(widths):
+        tank = RectangularTank(w, aspect_ratio*w, *element_counts)
+        solver = SloshingSolver(tank)
+        solver.G = w * (reference.G + k * np.log(w) * lengths)
+        solver.Q = reference.Q
+        solver.solve_eigenvalue_problem(number_of_modes)
+
+        natural_frequencies[i] = real_part(solver.natural_frequencies, 'frequencies')
+        natural_modes[i] = real_part(solver.natural_modes, 'modes')
+
+    return natural_frequencies, natural_modes
+
+
+def sweep(widths, depths, element_counts, number_of_modes=4, workers=None):
+    """Solve the eigenvalue problem for a grid of rectangular tanks.
+
+    Cases are grouped by depth to width ratio and element counts, so that each
+    group of geometrically similar tanks reuses one pair of influence matrices.
+    Groups are solved concurrently in a process pool.
+
+    Parameters
+    ----------
+    widths : array_like[float]
+        Tanks' widths.
+    depths : array_like[float]
+        Tanks' depths.
+    element_counts : list[tuple[int]]
+        Number of width, depth and free surface elements, as in RectangularTank.
+    number_of_modes : int, default=4
+        Number of lowest sloshing modes. A tank with nz free surface elements
+        has nz - 1 modes, so it must not exceed the smallest nz - 1.
+    workers : int, default=None
+        Number of worker processes. Defaults to the number of processors.
+
+    Returns
+    -------
+    results : numpy.ndarray
+        Structured array with one row per (width, depth, element counts) case
+        and fields width, depth, number_of_width_elements,
+        number_of_depth_elements, number_of_free_surface_elements,
+        natural_frequencies and natural_modes. Natural modes are padded with NaN
+        up to the largest number of free surface elements.
+    """
+
+    available_modes = min(counts[2] for counts in element_counts) - 1
+    if not 1 <= number_of_modes <= available_modes:
+        raise ValueError(
+            f"number_of_modes must be between 1 and {available_modes}, the number "
+            "of free surface elements minus one of the coarsest mesh"
+        )
+
+    cases = list(product(widths, depths, element_counts))
+    nz_max = max(counts[2] for counts in element_counts)
+
+    dtype = np.dtype([
+        ('width', np.float64),
+        ('depth', np.float64),
+        ('number_of_width_elements', np.int64),
+        ('number_of_depth_elements', np.int64),
+        ('number_of_free_surface_elements', np.int64),
+        ('natural_frequencies', np.float64, (number_of_modes,)),
+        ('natural_modes', np.float64, (nz_max, number_of_modes)),
+    ])
+    results = np.empty(len(cases), dtype=dtype)
+    results['natural_modes'] = np.nan
+
+    # Group geometrically similar tanks.
+    groups = {}
+    for i, (w, h, counts) in enumerate(cases):
+        key = (np.round(h / w, 12), tuple(counts))
+        groups.setdefault(key, []).append(i)
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            key: executor.submit(
+                solve_similar_tanks,
+                key[0],
+                key[1],
+                [cases[i][0] for i in indices],
+                number_of_modes,
+            )
+            for key, indices in groups.items()
+        }
+
+        for key, indices in groups.items():
+            natural_frequencies, natural_modes = futures[key].result()
+
+            for j, i in enumerate(indices):
+                w, h, (nx, ny, nz) = cases[i]
+                results['width'][i] = w
+                results['depth'][i] = h
+                results['number_of_width_elements'][i] = nx
+                results['number_of_depth_elements'][i] = ny
+                results['number_of_free_surface_elements'][i] = nz
+                results['natural_frequencies'][i] = natural_frequencies[j]
+                results['natural_modes'][i, :nz] = natural_modes[j]
+
+    return results
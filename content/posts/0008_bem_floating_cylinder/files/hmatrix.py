@@ -0,0 +1,448 @@
+import numpy as np
+
+eps = np.finfo(np.float64).eps
+
+
+def local_coordinates(points, starts, ends):
+    """Points' coordinates in the local system of elements, pair by pair.
+
+    The origin is the element midpoint, x is along the element and y is along
+    the normal (ty, -tx). The element half-length a is also returned.
+    """
+
+    r = ends - starts
+    length = np.linalg.norm(r, axis=-1)
+    tx = r[..., 0] / length
+    ty = r[..., 1] / length
+    dif = points - 0.5*(starts + ends)
+
+    x = dif[..., 0]*tx + dif[..., 1]*ty
+    y = dif[..., 0]*ty - dif[..., 1]*tx
+
+    return x, y, 0.5*length
+
+
+def laplace_kernel_g(points, starts, ends):
+    """Integral of the Green's function (1/2π) ln r over elements, pair by pair.
+
+    Parameters are as in laplace_kernel.
+    """
+
+    x, y, a = local_coordinates(points, starts, ends)
+    xma = x - a
+    xpa = x + a
+    r1 = xma**2 + y**2
+    r2 = xpa**2 + y**2
+    t1 = np.arctan2(y, xma)
+    t2 = np.arctan2(y, xpa)
+
+    # At the element end points, x*log(x) → 0 as x → 0.
+    r1 = np.where(r1 > 0.0, r1, 1.0)
+    r2 = np.where(r2 > 0.0, r2, 1.0)
+
+    return 0.25 / np.pi * (2*y*(t1 - t2) - xma*np.log(r1) + xpa*np.log(r2) - 4*a)
+
+
+def laplace_kernel_q(points, starts, ends):
+    """Integral of the Green's function normal derivative over elements, pair
+    by pair.
+
+    Parameters are as in laplace_kernel.
+    """
+
+    x, y, a = local_coordinates(points, starts, ends)
+    t1 = np.arctan2(y, x - a)
+    t2 = np.arctan2(y, x + a)
+
+    # Q is discontinuous in |x| < a and y = 0.
+    return np.where(np.abs(y) <= 2*a*eps, 0.0, -0.5 / np.pi * (t1 - t2))
+
+
+def laplace_kernel(points, starts, ends):
+    """Laplace influence coefficients of elements at points, pair by pair.
+
+    Parameters
+    ----------
+    points : numpy.ndarray
+        Field points' coordinates with shape (..., 2).
+    starts : numpy.ndarray
+        Elements' first end points with shape (..., 2).
+    ends : numpy.ndarray
+        Elements' second end points with shape (..., 2).
+
+    Returns
+    -------
+    G : numpy.ndarray
+        Integral of the Green's function (1/2π) ln r over the element.
+    Q : numpy.ndarray
+        Integral of the Green's function normal derivative over the element.
+    """
+
+    return laplace_kernel_g(points, starts, ends), laplace_kernel_q(points, starts, ends)
+
+
+class Cluster:
+    """Node of a cluster tree over element midpoints.
+
+    Parameters
+    ----------
+    indices : numpy.ndarray
+        Elements' indices in the cluster.
+    points : numpy.ndarray
+        Elements' midpoints with shape (n, 2).
+    leaf_size : int
+        Maximum number of elements in a leaf cluster.
+    level : int
+        Cluster depth in the tree.
+    """
+
+    def __init__(self, indices, points, leaf_size, level=0):
+        self.indices = indices
+        self.level = level
+        self.bmin = points[indices].min(axis=0)
+        self.bmax = points[indices].max(axis=0)
+        self.diameter = np.linalg.norm(self.bmax - self.bmin)
+        self.children = []
+
+        if len(indices) > leaf_size:
+            # Bisect the bounding box along its longest side.
+            axis = np.argmax(self.bmax - self.bmin)
+            order = np.argsort(points[indices, axis], kind='stable')
+            half = len(indices) // 2
+            self.children = [
+                Cluster(indices[order[:half]], points, leaf_size, level + 1),
+                Cluster(indices[order[half:]], points, leaf_size, level + 1),
+            ]
+
+    def distance(self, other):
+        """Distance between the bounding boxes of two clusters."""
+
+        gap = np.maximum(0.0, np.maximum(self.bmin - other.bmax, other.bmin - self.bmax))
+
+        return np.linalg.norm(gap)
+
+    def is_admissible(self, other, eta):
+        return min(self.diameter, other.diameter) <= eta * self.distance(other)
+
+
+def aca(get_row, get_col, shape, tol, max_zero_crosses=8):
+    """Adaptive cross approximation with partial pivoting, A ≈ U @ V.
+
+    Influence blocks may have zero rows and columns, e.g. Q between collinear
+    elements. When the pivot row is zero, unused columns spread over the block
+    are searched for a nonzero entry to restart from.
+
+    Parameters
+    ----------
+    get_row : callable
+        Function that returns row i of the block.
+    get_col : callable
+        Function that returns column j of the block.
+    shape : tuple[int]
+        Block shape (m, n).
+    tol : float
+        Relative tolerance in the Frobenius norm.
+    max_zero_crosses : int, default=8
+        Number of zero rows and columns searched before the block is
+        considered fully approximated.
+
+    Returns
+    -------
+    U : numpy.ndarray
+        Left factor with shape (m, rank).
+    V : numpy.ndarray
+        Right factor with shape (rank, n).
+    """
+
+    m, n = shape
+    us = []
+    vs = []
+    used_rows = np.zeros(m, dtype=np.bool)
+    used_cols = np.zeros(n, dtype=np.bool)
+    norm2 = 0.0
+
+    def residual_row(i):
+        row = get_row(i)
+        for u, v in zip(us, vs):
+            row = row - u[i] * v
+        return row
+
+    def residual_col(j):
+        col = get_col(j)
+        for u, v in zip(us, vs):
+            col = col - v[j] * u
+        return col
+
+    def is_zero(a):
+        return np.abs(a).max() <= eps * np.sqrt(norm2)
+
+    def find_pivot_row():
+        """Unused row with a nonzero residual entry, or None."""
+
+        rows = np.flatnonzero(~used_rows)
+        cols = np.flatnonzero(~used_cols)
+        for k in range(max_zero_crosses):
+            if len(rows):
+                i = rows[(k * len(rows)) // max_zero_crosses]
+                row = residual_row(i)
+                used_rows[i] = True
+                if not is_zero(row):
+                    return i, row
+            if len(cols):
+                j = cols[(k * len(cols)) // max_zero_crosses]
+                col = residual_col(j)
+                used_cols[j] = True
+                col = np.where(used_rows, 0.0, col)
+                if not is_zero(col):
+                    i = np.argmax(np.abs(col))
+                    used_rows[i] = True
+                    return i, residual_row(i)
+        return None
+
+    i = 0
+    used_rows[i] = True
+    row = residual_row(i)
+
+    while len(us) < min(m, n):
+        if is_zero(row):
+            pivot = find_pivot_row()
+            if pivot is None:
+                break
+            i, row = pivot
+
+        j = np.argmax(np.abs(row))
+        used_cols[j] = True
+        v = row / row[j]
+        u = residual_col(j)
+
+        # Frobenius norm of the approximation, updated with the new cross.
+        uu = np.vdot(u, u).real
+        vv = np.vdot(v, v).real
+        norm2 += uu * vv + 2 * sum((np.vdot(uk, u) * np.vdot(vk, v)).real for uk, vk in zip(us, vs))
+        us.append(u)
+        vs.append(v)
+
+        if np.sqrt(uu * vv) <= tol * np.sqrt(norm2):
+            break
+
+        # Next pivot row: largest entry of u among unused rows.
+        candidates = np.where(used_rows, -1.0, np.abs(u))
+        i = np.argmax(candidates)
+        if used_rows[i]:
+            break
+        used_rows[i] = True
+        row = residual_row(i)
+
+    if not us:
+        return np.zeros((m, 0), dtype=row.dtype), np.zeros((0, n), dtype=row.dtype)
+
+    return np.column_stack(us), np.vstack(vs)
+
+
+class HMatrix:
+    """Hierarchical matrix with dense and low rank (U @ V) blocks.
+
+    Parameters
+    ----------
+    shape : tuple[int]
+        Matrix shape.
+    diagonal_shift : float, default=0.0
+        Multiple of the identity added to the matrix.
+    dtype : numpy.dtype, default=numpy.float64
+        Entries' data type.
+
+    Attributes
+    ----------
+    blocks : list[tuple]
+        Blocks (rows, cols, level, kind, data). For kind 'lowrank', data is the
+        (U, V) pair. For kind 'dense', data is the block.
+    """
+
+    def __init__(self, shape, diagonal_shift=0.0, dtype=np.float64):
+        self.shape = shape
+        self.diagonal_shift = diagonal_shift
+        self.dtype = np.dtype(dtype)
+        self.blocks = []
+
+    def add_block(self, rows, cols, level, kind, data):
+        self.blocks.append((rows, cols, level, kind, data))
+
+    @property
+    def number_of_stored_entries(self):
+        entries = 0
+        for rows, cols, level, kind, data in self.blocks:
+            if kind == 'lowrank':
+                entries += data[0].size + data[1].size
+            else:
+                entries += data.size
+
+        return entries
+
+    @property
+    def compression_ratio(self):
+        """Ratio between the stored entries and the dense matrix entries."""
+
+        return self.number_of_stored_entries / (self.shape[0] * self.shape[1])
+
+    def toarray(self):
+        A = np.zeros(self.shape, dtype=self.dtype)
+        for rows, cols, level, kind, data in self.blocks:
+            if kind == 'lowrank':
+                A[np.ix_(rows, cols)] = data[0] @ data[1]
+            else:
+                A[np.ix_(rows, cols)] = data
+
+        A[np.diag_indices(min(self.shape))] += self.diagonal_shift
+
+        return A
+
+    def matvec(self, x):
+        y = self.diagonal_shift * x.astype(np.result_type(x, self.dtype))
+        for rows, cols, level, kind, data in self.blocks:
+            if kind == 'lowrank':
+                y[rows] += data[0] @ (data[1] @ x[cols])
+            else:
+                y[rows] += data @ x[cols]
+
+        return y
+
+    def __matmul__(self, x):
+        return self.matvec(x)
+
+    def info(self):
+        """Statistics of the blocks at each level of the block tree.
+
+        Returns
+        -------
+        levels : dict
+            For each level, the number of dense and low rank blocks, the mean
+            and maximum rank of the low rank blocks, and the compression ratio,
+            i.e. stored entries over the dense entries of the level's blocks.
+        """
+
+        levels = {}
+        for rows, cols, level, kind, data in self.blocks:
+            stats = levels.setdefault(level, {
+                'dense_blocks': 0, 'lowrank_blocks': 0, 'ranks': [], 'stored': 0, 'entries': 0,
+            })
+            stats['entries'] += len(rows) * len(cols)
+            if kind == 'lowrank':
+                stats['lowrank_blocks'] += 1
+                stats['ranks'].append(data[0].shape[1])
+                stats['stored'] += data[0].size + data[1].size
+            else:
+                stats['dense_blocks'] += 1
+                stats['stored'] += data.size
+
+        for level in sorted(levels):
+            stats = levels[level]
+            ranks = stats.pop('ranks')
+            stats['mean_rank'] = np.mean(ranks) if ranks else 0.0
+            stats['max_rank'] = max(ranks, default=0)
+            stats['compression_ratio'] = stats.pop('stored') / stats.pop('entries')
+
+        return dict(sorted(levels.items()))
+
+
+def build_hmatrix(points, get_block, tol=1.0e-8, leaf_size=32, eta=1.0, diagonal_shift=0.0, dtype=np.float64):
+    """Build an H-matrix of influence coefficients from a block function.
+
+    Blocks of well separated clusters, min(diam(t), diam(s)) ≤ eta dist(t, s),
+    are compressed with adaptive cross approximation, which only evaluates the
+    rows and columns it needs, and the remaining leaf blocks are dense.
+
+    Parameters
+    ----------
+    points : numpy.ndarray
+        Elements' midpoints, i.e. collocation points, with shape (n, 2).
+    get_block : callable
+        Function that returns the block A[rows][:, cols] for index arrays rows
+        and cols.
+    tol : float, default=1e-8
+        Relative tolerance of the low rank blocks.
+    leaf_size : int, default=32
+        Maximum number of elements in a leaf cluster.
+    eta : float, default=1.0
+        Admissibility parameter.
+    diagonal_shift : float, default=0.0
+        Multiple of the identity added to the matrix.
+    dtype : numpy.dtype, default=numpy.float64
+        Entries' data type.
+
+    Returns
+    -------
+    H : HMatrix
+        Hierarchical matrix.
+    """
+
+    n = len(points)
+    root = Cluster(np.arange(n), points, leaf_size)
+    H = HMatrix((n, n), diagonal_shift, dtype)
+
+    def build_block(t, s):
+        rows = t.indices
+        cols = s.indices
+        level = max(t.level, s.level)
+
+        if t.is_admissible(s, eta):
+            get_row = lambda i: get_block(rows[i:i+1], cols)[0]
+            get_col = lambda j: get_block(rows, cols[j:j+1])[:, 0]
+            U, V = aca(get_row, get_col, (len(rows), len(cols)), tol)
+
+            if U.shape[1] * (len(rows) + len(cols)) < len(rows) * len(cols):
+                H.add_block(rows, cols, level, 'lowrank', (U, V))
+            else:
+                H.add_block(rows, cols, level, 'dense', U @ V)
+        elif not t.children or not s.children:
+            H.add_block(rows, cols, level, 'dense', get_block(rows, cols))
+        else:
+            for tc in t.children:
+                for sc in s.children:
+                    build_block(tc, sc)
+
+    build_block(root, root)
+
+    return H
+
+
+def build_hmatrix_influence_matrices(vertices, tol=1.0e-8, leaf_size=32, eta=1.0):
+    """Build H-matrix influence matrices G and Q of a closed polygon.
+
+    Collocation points are the element midpoints. G and Q are built with
+    build_hmatrix, each one evaluating only its own kernel. Q includes the
+    -1/2 diagonal jump as a diagonal shift, as in
+    Solver._build_influence_matrices.
+
+    Parameters
+    ----------
+    vertices : numpy.ndarray
+        Closed boundary vertices with shape (n + 1, 2).
+    tol : float, default=1e-8
+        Relative tolerance of the low rank blocks.
+    leaf_size : int, default=32
+        Maximum number of elements in a leaf cluster.
+    eta : float, default=1.0
+        Admissibility parameter.
+
+    Returns
+    -------
+    G : HMatrix
+        Integral of the Green's function over the elements.
+    Q : HMatrix
+        Integral of the Green's function normal derivative over the elements.
+    """
+
+    vertices = np.asarray(vertices, dtype=np.float64)
+    starts = vertices[:-1]
+    ends = vertices[1:]
+    midpoints = 0.5*(starts + ends)
+
+    def get_kernel_block(kernel):
+        return lambda rows, cols: kernel(
+            midpoints[rows, np.newaxis], starts[np.newaxis, cols], ends[np.newaxis, cols]
+        )
+
+    G = build_hmatrix(midpoints, get_kernel_block(laplace_kernel_g), tol, leaf_size, eta)
+    Q = build_hmatrix(midpoints, get_kernel_block(laplace_kernel_q), tol, leaf_size, eta, diagonal_shift=-0.5)
+
+    return G, Q
@@ -0,0 +1,210 @@
+import warnings
+import numpy as np
+from scipy.linalg import lu_factor, lu_solve
+from scipy.sparse import coo_matrix
+from scipy.sparse.linalg import LinearOperator, aslinearoperator, gmres, splu
+from scipy.spatial import cKDTree
+
+
+def get_operator(operator, n):
+    """Linear operator from a matrix, an object with matvec or a function."""
+
+    if isinstance(operator, LinearOperator):
+        return operator
+    elif isinstance(operator, np.ndarray):
+        return aslinearoperator(operator)
+    elif hasattr(operator, 'matvec'):
+        return LinearOperator((n, n), matvec=operator.matvec, dtype=np.complex128)
+    elif callable(operator):
+        return LinearOperator((n, n), matvec=operator, dtype=np.complex128)
+
+    raise ValueError("Operator must be a matrix, have a matvec method or be callable")
+
+
+def get_entries_function(entries):
+    """Function that returns the entries A[i, j] for index arrays i and j."""
+
+    if isinstance(entries, np.ndarray):
+        return lambda i, j: entries[i, j]
+
+    return entries
+
+
+def block_jacobi(entries, n, block_size=64):
+    """Block-Jacobi preconditioner with contiguous diagonal blocks.
+
+    Elements are numbered along the boundary, so contiguous indices are
+    neighbouring elements.
+
+    Parameters
+    ----------
+    entries : numpy.ndarray or callable
+        System matrix, or function that returns A[i, j] for index arrays.
+    n : int
+        Number of unknowns.
+    block_size : int, default=64
+        Diagonal blocks' size.
+
+    Returns
+    -------
+    M : scipy.sparse.linalg.LinearOperator
+        Approximate inverse of the system matrix.
+    """
+
+    get_entries = get_entries_function(entries)
+    starts = range(0, n, block_size)
+    factors = []
+    for start in starts:
+        idx = np.arange(start, min(start + block_size, n))
+        i, j = np.meshgrid(idx, idx, indexing='ij')
+        factors.append(lu_factor(get_entries(i, j)))
+
+    def matvec(x):
+        x = np.ravel(x)
+        y = np.empty(n, dtype=np.complex128)
+        for start, lu in zip(starts, factors):
+            block = slice(start, start + len(lu[1]))
+            y[block] = lu_solve(lu, x[block])
+        return y
+
+    return LinearOperator((n, n), matvec=matvec, dtype=np.complex128)
+
+
+def near_field(entries, points, radius):
+    """Near field sparse preconditioner.
+
+    Keeps the entries between elements whose midpoints are closer than radius
+    and factorizes the sparse matrix.
+
+    Parameters
+    ----------
+    entries : numpy.ndarray or callable
+        System matrix, or function that returns A[i, j] for index arrays.
+    points : numpy.ndarray
+        Elements' midpoints with shape (n, 2).
+    radius : float
+        Near field radius.
+
+    Returns
+    -------
+    M : scipy.sparse.linalg.LinearOperator
+        Approximate inverse of the system matrix.
+    """
+
+    get_entries = get_entries_function(entries)
+    n = len(points)
+
+    pairs = cKDTree(points).query_pairs(radius, output_type='ndarray')
+    diagonal = np.arange(n)
+    i = np.concatenate((diagonal, pairs[:, 0], pairs[:, 1]))
+    j = np.concatenate((diagonal, pairs[:, 1], pairs[:, 0]))
+
+    A = coo_matrix((get_entries(i, j), (i, j)), shape=(n, n)).tocsc()
+    lu = splu(A)
+
+    return LinearOperator((n, n), matvec=lambda x: lu.solve(np.ravel(x)), dtype=np.complex128)
+
+
+def solve(
+    entries,
+    b,
+    operator=None,
+    preconditioner='block_jacobi',
+    block_size=64,
+    points=None,
+    radius=None,
+    tol=1.0e-8,
+    restart=50,
+    maxiter=None,
+):
+    """Solve A x = b with restarted GMRES.
+
+    Parameters
+    ----------
+    entries : numpy.ndarray or callable
+        System matrix, or function that returns A[i, j] for index arrays. It
+        is used by the preconditioner, and for the products if it is a matrix
+        and operator is None.
+    b : numpy.ndarray
+        Right-hand side with shape (n,) or (n, nrhs).
+    operator : default=None
+        Matrix-vector product of A: a matrix, a LinearOperator, an object
+        with a matvec method, such as a compressed matrix, or a function.
+        Required if entries is a function.
+    preconditioner : str, default='block_jacobi'
+        Preconditioner: 'block_jacobi', 'near_field' or None.
+    block_size : int, default=64
+        Diagonal blocks' size of the block-Jacobi preconditioner.
+    points : numpy.ndarray, default=None
+        Elements' midpoints, for the near field preconditioner.
+    radius : float, default=None
+        Near field radius.
+    tol : float, default=1e-8
+        Relative residual tolerance.
+    restart : int, default=50
+        Number of iterations between restarts.
+    maxiter : int, default=None
+        Maximum number of restarts.
+
+    Returns
+    -------
+    x : numpy.ndarray
+        Solution with the shape of b.
+    info : list[dict]
+        For each right-hand side, the number of iterations, the residual
+        history, relative to the norm of b, and the convergence flag. A
+        RuntimeWarning is issued for each right-hand side that does not
+        converge.
+    """
+
+    b = np.asarray(b, dtype=np.complex128)
+    n = b.shape[0]
+
+    if operator is None:
+        if not isinstance(entries, np.ndarray):
+            raise ValueError("An operator is required when entries is a function")
+        operator = entries
+
+    A = get_operator(operator, n)
+
+    if preconditioner is None:
+        M = None
+    elif preconditioner == 'block_jacobi':
+        M = block_jacobi(entries, n, block_size)
+    elif preconditioner == 'near_field':
+        if points is None or radius is None:
+            raise ValueError("Near field preconditioner requires points and radius")
+        M = near_field(entries, points, radius)
+    else:
+        raise ValueError(f"Invalid preconditioner: {preconditioner}")
+
+    B = b.reshape((n, -1))
+    X = np.empty_like(B)
+    info = []
+    for k in range(B.shape[1]):
+        residuals = []
+        X[:, k], flag = gmres(
+            A,
+            B[:, k],
+            rtol=tol,
+            restart=restart,
+            maxiter=maxiter,
+            M=M,
+            callback=residuals.append,
+            callback_type='pr_norm',
+        )
+        if flag < 0:
+            raise ValueError(f"GMRES failed with illegal input or breakdown, flag {flag}")
+        elif flag > 0:
+            warnings.warn(
+                f"GMRES did not converge to tol={tol} for right-hand side {k} "
+                f"after {len(residuals)} iterations",
+                RuntimeWarning,
+            )
+        info.append({
+            'iterations': len(residuals),
+            'residuals': np.array(residuals),
+            'converged': flag == 0,
+        })
+
+    return X.reshape(b.shape), info
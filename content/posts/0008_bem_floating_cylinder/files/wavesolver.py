@@ -1,16 +1,66 @@
 import numpy as np
+from scipy.linalg import lu_factor, lu_solve
+from scipy.optimize import brentq
 from twodubem.solver import Solver
 from twodubem.laplace import Laplace
+import iterative
+from hmatrix import build_hmatrix_influence_matrices, laplace_kernel
 
 
 class RadiationSolver(Solver):
+    """Solver for the radiation problem.
+
+    Parameters
+    ----------
+    boundaries : FloatingCylinder
+        Fluid domain boundaries.
+    linear_solver : str, default='direct'
+        Linear system solver: 'direct' or 'gmres'.
+    solver_options : dict, default=None
+        Keyword arguments of iterative.solve, such as preconditioner, tol or
+        operator, a matrix-free product with the system matrix.
+    assembly : str, default='dense'
+        Influence matrices: 'dense', or 'hmatrix', H-matrices built with
+        hmatrix.build_hmatrix_influence_matrices. With H-matrices, the system
+        matrix is never assembled: GMRES uses products with G and Q and the
+        preconditioner evaluates the entries it needs with the kernel, so
+        linear_solver must be 'gmres'.
+    hmatrix_options : dict, default=None
+        Keyword arguments of build_hmatrix_influence_matrices, such as tol,
+        leaf_size or eta.
+    """
+
+    def __init__(
+        self,
+        boundaries,
+        linear_solver='direct',
+        solver_options=None,
+        assembly='dense',
+        hmatrix_options=None,
+    ):
+        if assembly not in ('dense', 'hmatrix'):
+            raise ValueError(f"Invalid assembly: {assembly}")
+        if assembly == 'hmatrix' and linear_solver != 'gmres':
+            raise ValueError("H-matrix assembly requires linear_solver='gmres'")
 
-    def __init__(self, boundaries):
         self.boundary = boundaries
+        self.linear_solver = linear_solver
+        self.solver_options = {} if solver_options is None else solver_options
+        self.assembly = assembly
+        self.hmatrix_options = {} if hmatrix_options is None else hmatrix_options
         self.green = Laplace()
         self.method = 'constant'
         self.g = 9.81  # Acceleration of gravity
         self.rho = 1.0  # Water density
+        self.number_of_evanescent_modes = 20  # For truncated domains
+
+    def _build_influence_matrices(self):
+        if self.assembly == 'hmatrix':
+            self.G, self.Q = build_hmatrix_influence_matrices(
+                self.boundary.vertices, **self.hmatrix_options
+            )
+        else:
+            super()._build_influence_matrices()
 
     def solve(self, w):
         """Solve the radiation potential of oscilation in heave."""
@@ -20,11 +70,26 @@ class RadiationSolver(Solver):
         if not hasattr(self, 'G') or not hasattr(self, 'Q'):
             self._build_influence_matrices()
 
+        if getattr(self.boundary, 'truncated', False):
+            self._solve_truncated(w)
+            return
+
         # Masks.
         free_surface = self.boundary.free_surface
         depth = self.boundary.depth
         bottom = self.boundary.depth
         cylinder = self.boundary.cylinder
+
+        if self.assembly == 'hmatrix':
+            q = np.zeros(self.boundary.number_of_elements, dtype=np.complex128)
+            q[cylinder] = 1j * w * self.boundary.normals[cylinder, 1]  # Heave dof
+
+            c = np.zeros(self.boundary.number_of_elements, dtype=np.complex128)
+            c[free_surface] = -k
+            c[depth] = 1j * k
+
+            self.phi = self._solve_matrix_free(c, self.G @ q)
+            return
         
         A = self.Q.copy().astype(np.complex128)
         q = np.zeros(self.boundary.number_of_elements).astype(np.complex128)
@@ -35,7 +100,50 @@ class RadiationSolver(Solver):
 
         b = self.G @ q
 
-        self.phi = np.linalg.solve(A, b)
+        self.phi = self._solve_linear_system(A, b)
+
+    def _solve_linear_system(self, A, b):
+        """Solve A phi = b, with iteration counts and residual histories of
+        the iterative solver in linear_solver_info."""
+
+        if self.linear_solver == 'direct':
+            return np.linalg.solve(A, b)
+        elif self.linear_solver == 'gmres':
+            options = {'points': self.boundary.midpoints, **self.solver_options}
+            phi, self.linear_solver_info = iterative.solve(A, b, **options)
+            return phi
+
+        raise ValueError(f"Invalid linear solver: {self.linear_solver}")
+
+    def _solve_matrix_free(self, c, b, dtn=()):
+        """Solve (Q + G C) phi = b with GMRES, without assembling the matrix.
+
+        C phi = c phi - Σ D phi[side], with the DtN matrices D of the sides of
+        truncated domains, so each product costs one product with Q and one
+        with G. The preconditioner uses the entries of Q + G diag(c), computed
+        with the Laplace kernel.
+        """
+
+        vertices = self.boundary.vertices
+        starts = vertices[:-1]
+        ends = vertices[1:]
+        midpoints = 0.5*(starts + ends)
+
+        def matvec(x):
+            x = np.ravel(x)
+            y = c * x
+            for side, D in dtn:
+                y[side] -= D @ x[side]
+            return self.Q @ x + self.G @ y
+
+        def entries(i, j):
+            g, q = laplace_kernel(midpoints[i], starts[j], ends[j])
+            return q - 0.5*(i == j) + c[j]*g
+
+        options = {'points': self.boundary.midpoints, 'operator': matvec, **self.solver_options}
+        phi, self.linear_solver_info = iterative.solve(entries, b, **options)
+
+        return phi
 
     def get_radiation_coefficients_and_wave_amplitude(self, w):
         k = w**2/self.g  # wave number
@@ -58,12 +166,277 @@ class RadiationSolver(Solver):
         az = -fy.real / w**2
         bz = fy.imag / w
 
-        # Mask for free surface points at a distance larger than R + λ away from the cylinder.
-        fsx = np.logical_and(np.abs(self.boundary.midpoints[:, 0]) > 1.0+l, free_surface)
-        
-        wsx = -1j * w / self.g * self.phi[fsx]
+        if getattr(self.boundary, 'truncated', False):
+            # Amplitude of the propagating mode on the truncation boundaries.
+            wsx = -1j * w / self.g * self.propagating_amplitudes
+        else:
+            # Mask for free surface points at a distance larger than R + λ away from the cylinder.
+            fsx = np.logical_and(np.abs(self.boundary.midpoints[:, 0]) > 1.0+l, free_surface)
+            
+            wsx = -1j * w / self.g * self.phi[fsx]
 
         # Wave amplitude.
         wa = np.abs(wsx).mean()
 
-        return az, bz, wa
\ No newline at end of file
+        return az, bz, wa
+
+    def sweep(self, wv, method='eig', memory=2**28):
+        """Radiation coefficients and wave amplitude for an array of frequencies.
+
+        The Laplace influence matrices do not depend on frequency, so the system
+        matrix is A(k) = Q - k*M, with M = G_F - i*G_D, where G_F and G_D hold the
+        free surface and depth columns of G.
+
+        Parameters
+        ----------
+        wv : numpy.ndarray
+            Wave frequencies.
+        method : str, default='eig'
+            Two methods are available: 'eig', where A(k0)^-1 M = V Λ V^-1 is
+            decomposed once and each frequency costs O(n^2), and 'batched', where
+            stacked systems are solved for chunks of frequencies.
+        memory : int, default=2**28
+            Memory budget in bytes for each chunk of stacked systems of the
+            'batched' method.
+
+        Returns
+        -------
+        az : numpy.ndarray
+            Heave added mass.
+        bz : numpy.ndarray
+            Heave wave damping.
+        wa : numpy.ndarray
+            Wave amplitude.
+        """
+
+        if getattr(self.boundary, 'truncated', False):
+            raise ValueError("Sweep is not available for truncated domains, use solve")
+        if self.assembly == 'hmatrix':
+            raise ValueError("Sweep requires dense influence matrices, use solve")
+
+        wv = np.asarray(wv, dtype=np.float64)
+        kv = wv**2/self.g  # For infinite depth
+        lv = 2*np.pi/kv  # Wave lengths
+
+        if not hasattr(self, 'G') or not hasattr(self, 'Q'):
+            self._build_influence_matrices()
+
+        # Masks.
+        free_surface = self.boundary.free_surface
+        depth = self.boundary.depth
+        cylinder = self.boundary.cylinder
+
+        n = self.boundary.number_of_elements
+        normals = self.boundary.normals[cylinder]
+        lengths = self.boundary.lengths[cylinder]
+
+        M = np.zeros((n, n), dtype=np.complex128)
+        M[:, free_surface] = self.G[:, free_surface]
+        M[:, depth] = -1j * self.G[:, depth]
+
+        # Heave dof. The right-hand side is b = 1j * w * b0.
+        q0 = np.zeros(n, dtype=np.complex128)
+        q0[cylinder] = normals[:, 1]
+        b0 = self.G @ q0
+
+        _method = method.strip().lower()
+        if _method == 'eig':
+            # Q is singular (constant potential), so A(k) is written around
+            # A0 = A(k0) as A(k) = A0 (I - (k - k0) W), with W = A0^-1 M.
+            # Only the free surface and depth columns (S) of W are nonzero, so
+            # the system is solved for these columns with W_SS = V Λ V^-1, and
+            # the remaining ones (R) follow from phi_S.
+            k0 = kv.mean()
+            lu = lu_factor(self.Q - k0 * M)
+            S = np.logical_or(free_surface, depth)
+            W = lu_solve(lu, M[:, S])
+            d = lu_solve(lu, b0)
+            lam, V = np.linalg.eig(W[S])
+            c = np.linalg.solve(V, d[S])
+
+            dk = kv[:, np.newaxis] - k0
+            phi_S = (c / (1.0 - dk * lam)) @ V.T
+            phi = np.empty((len(wv), n), dtype=np.complex128)
+            phi[:, S] = phi_S
+            phi[:, ~S] = d[~S] + dk * (phi_S @ W[~S].T)
+            phi *= 1j * wv[:, np.newaxis]
+        elif _method == 'batched':
+            phi = np.empty((len(wv), n), dtype=np.complex128)
+            chunk = max(1, memory // (16 * n**2))
+            for i in range(0, len(wv), chunk):
+                k = kv[i:i+chunk, np.newaxis, np.newaxis]
+                A = self.Q - k * M
+                b = np.broadcast_to(b0[:, np.newaxis], (len(k), n, 1))
+                phi[i:i+chunk] = 1j * wv[i:i+chunk, np.newaxis] * np.linalg.solve(A, b)[..., 0]
+        else:
+            raise ValueError(f"Invalid sweep method: {method}")
+
+        # Radiation coefficients.
+        fy = 1j * self.rho * wv * np.sum(phi[:, cylinder] * normals[:, 1] * lengths, axis=1)
+        az = -fy.real / wv**2
+        bz = fy.imag / wv
+
+        # Wave amplitude, from free surface points at a distance larger than R + λ away from the cylinder.
+        wa = np.empty_like(wv)
+        for i in range(len(wv)):
+            fsx = np.logical_and(np.abs(self.boundary.midpoints[:, 0]) > 1.0+lv[i], free_surface)
+            wa[i] = np.abs(-1j * wv[i] / self.g * phi[i, fsx]).mean()
+
+        return az, bz, wa
+
+    def _solve_truncated(self, w):
+        """Solve the radiation potential in a truncated domain.
+
+        On each vertical boundary, the potential is expanded in the finite
+        depth modes, a propagating mode Z0 = cosh(k0 (y+h)) / cosh(k0 h) and
+        evanescent modes Zm = cos(km (y+h)), which leave the domain as
+        exp(-i k0 x) and exp(-km x), for the exp(i w t) time dependence. The
+        Dirichlet-to-Neumann condition is then ∂φ/∂n = Σ κm Zm <φ, Zm> / <Zm, Zm>,
+        with κ0 = -i k0 and κm = -km. The modes are sampled at the midpoints
+        of the side's elements, so the number of evanescent modes is limited
+        to the number of elements of a side minus one, otherwise the
+        oscillating modes alias and the DtN matrix is wrong.
+        """
+
+        K = w**2/self.g
+        h = self.boundary.water_depth
+        m = min(self.number_of_evanescent_modes, self.boundary.nd - 1)
+        k0, km = dispersion_roots(K, h, m)
+
+        # Masks.
+        free_surface = self.boundary.free_surface
+        cylinder = self.boundary.cylinder
+        negative = self.boundary.midpoints[:, 0] < 0.0
+        sides = [
+            np.logical_and(self.boundary.depth, negative),
+            np.logical_and(self.boundary.depth, ~negative),
+        ]
+
+        hmatrix = self.assembly == 'hmatrix'
+        if hmatrix:
+            c = np.zeros(self.boundary.number_of_elements, dtype=np.complex128)
+            c[free_surface] = -K
+            dtn = []
+        else:
+            A = self.Q.copy().astype(np.complex128)
+            A[:, free_surface] += -K * self.G[:, free_surface]
+
+        q = np.zeros(self.boundary.number_of_elements).astype(np.complex128)
+
+        projections = []
+        for side in sides:
+            y = self.boundary.midpoints[side, 1]
+            lengths = self.boundary.lengths[side]
+            Z, N = depth_modes(k0, km, h, y)
+            kappa = np.concatenate(([-1j * k0], -km))
+
+            # Projection of φ on the modes and DtN matrix of this side.
+            P = (Z * lengths[:, np.newaxis]).T / N[:, np.newaxis]
+            D = Z @ (kappa[:, np.newaxis] * P)
+            if hmatrix:
+                dtn.append((side, D))
+            else:
+                A[:, side] -= self.G[:, side] @ D
+            projections.append(P[0])
+
+        q[cylinder] = 1j * w * self.boundary.normals[cylinder, 1]  # Heave dof
+
+        b = self.G @ q
+
+        if hmatrix:
+            self.phi = self._solve_matrix_free(c, b, dtn)
+        else:
+            self.phi = self._solve_linear_system(A, b)
+        self.propagating_amplitudes = np.array(
+            [P0 @ self.phi[side] for P0, side in zip(projections, sides)]
+        )
+
+
+def dispersion_roots(K, h, m):
+    """Finite depth wave numbers for K = w²/g.
+
+    Returns
+    -------
+    k0 : float
+        Propagating wave number, root of k tanh(kh) = K.
+    km : numpy.ndarray
+        First m evanescent wave numbers, roots of k tan(kh) = -K.
+    """
+
+    f = lambda k: k*np.tanh(k*h) - K
+    a = K
+    b = K / np.tanh(K*h)
+    k0 = a if f(b) <= 0.0 else brentq(f, a, b, xtol=1.0e-14*b)
+
+    # Each root is in ((j - 1/2) π/h, j π/h).
+    g = lambda k: k*np.tan(k*h) + K
+    km = np.empty(m)
+    for j in range(1, m+1):
+        a = (j - 0.5) * np.pi / h
+        b = j * np.pi / h
+        km[j-1] = brentq(g, a*(1.0 + 1.0e-12), b, xtol=1.0e-14*b)
+
+    return k0, km
+
+
+def depth_modes(k0, km, h, y):
+    """Finite depth modes at the points y ∈ [-h, 0] and their norms.
+
+    Returns
+    -------
+    Z : numpy.ndarray
+        Modes' values with shape (len(y), len(km) + 1).
+    N : numpy.ndarray
+        Modes' norms ∫ Zm² dy over [-h, 0].
+    """
+
+    # cosh(k0 (y+h)) / cosh(k0 h), written to avoid overflow.
+    Z0 = np.exp(k0*y) * (1.0 + np.exp(-2*k0*(y+h))) / (1.0 + np.exp(-2*k0*h))
+    N0 = 0.5*h / np.cosh(k0*h)**2 + 0.5*np.tanh(k0*h) / k0
+
+    Zm = np.cos(km * (y[:, np.newaxis] + h))
+    Nm = 0.5*h + 0.25*np.sin(2*km*h) / km
+
+    Z = np.column_stack((Z0, Zm))
+    N = np.concatenate(([N0], Nm))
+
+    return Z, N
+
+
+def compare_truncation(wv, lmin, lmax, truncation_radius, truncation_depth=None):
+    """Radiation coefficients of a truncated domain and of the lmax based domain.
+
+    Both domains are approximations, so their agreement is not a measure of
+    accuracy; compare both against Ursell's results in references/ (see
+    FloatingCylinder). A truncation depth much smaller than the wave length
+    turns the problem into a finite depth one, and differs from the large
+    domain by up to 60% for depths of 2 truncation radii.
+
+    Returns
+    -------
+    results : dict
+        Heave added mass, wave damping and wave amplitude of both domains,
+        keys 'large' and 'truncated', and the number of elements of each one.
+    """
+
+    from cylinder import FloatingCylinder
+
+    domains = {
+        'large': FloatingCylinder(lmin, lmax),
+        'truncated': FloatingCylinder(lmin, lmax, truncation_radius, truncation_depth),
+    }
+
+    results = {}
+    for name, domain in domains.items():
+        solver = RadiationSolver(domain)
+        coefficients = np.array(
+            [solver.get_radiation_coefficients_and_wave_amplitude(w) for w in wv]
+        )
+        results[name] = {
+            'number_of_elements': domain.number_of_elements,
+            'az': coefficients[:, 0],
+            'bz': coefficients[:, 1],
+            'wa': coefficients[:, 2],
+        }
+
+    return results
@@ -0,0 +1,158 @@
+"""Tabulated exp(-Z) E1(-Z), with Z = V3 - iX, on a graded (X, V3) grid.
+
+The Green function core depends only on the dimensionless variables X = K R
+and V3 = K |z + ζ|. The range [0, 32] x [0, 32] is split in patches with
+dyadic breakpoints and each patch holds a 2D Chebyshev series. Since the
+function has a log singularity at Z = 0, the first patch tabulates the entire
+function exp(-Z) (E1(-Z) + log(-Z)). Outside the range, and at X = 0, on the
+branch cut of E1, SciPy's exp1 is used.
+
+The maximum relative error, against mpmath on random points of the tabulated
+range, is below 2e-14 (SciPy's exp1 is below 5e-15).
+
+The table is only faster than exp1 on large arrays spread evenly over the
+range, about twice as fast. The points of influence matrices are mostly on
+the first patches or outside the range, and grouping them by patch costs more
+than it saves: assembling a cylinder mesh takes 0.81 s with the table against
+0.63 s with exp1 per 1e6 points. It is therefore an opt-in core of the Green
+function (core='table'), and exp1 is the default.
+"""
+
+import numpy as np
+from pathlib import Path
+from scipy.special import exp1
+
+coefs_file = Path(__file__).resolve().parent / 'expexp1_table.npz'
+
+# Patches' breakpoints, equal for X and V3.
+breakpoints = np.array([0.0, 0.5, 1.0, 2.0, 4.0, 8.0, 16.0, 32.0])
+
+max_error = 2.0e-14  # Maximum relative error in the tabulated range.
+
+
+def generate_coefficients(filename=coefs_file, degree=24, dps=30):
+    """Generate the patches' 2D Chebyshev coefficients with mpmath.
+
+    Coefficients are computed by interpolation at the tensor product of the
+    Chebyshev points of the first kind, which are interior to the patches, so
+    X = 0, where the branch cut of E1 lies, is never evaluated.
+    """
+
+    import mpmath as mp
+
+    n = degree + 1
+    m = len(breakpoints) - 1
+    coefs = np.zeros((m, m, n, n), dtype=np.complex128)
+
+    theta = (np.arange(n) + 0.5) * np.pi / n
+    nodes = np.cos(theta)
+    T = np.cos(np.outer(np.arange(n), theta))  # T[j, k] = T_j(nodes[k])
+
+    with mp.workdps(dps):
+        for i in range(m):
+            x = 0.5*(breakpoints[i+1] + breakpoints[i]) + 0.5*(breakpoints[i+1] - breakpoints[i])*nodes
+            for j in range(m):
+                v = 0.5*(breakpoints[j+1] + breakpoints[j]) + 0.5*(breakpoints[j+1] - breakpoints[j])*nodes
+                f = np.empty((n, n), dtype=np.complex128)
+                for p in range(n):
+                    for q in range(n):
+                        w = mp.mpc(-v[q], x[p])  # w = -Z
+                        fw = mp.exp(w) * mp.e1(w)
+                        if i == 0 and j == 0:
+                            fw += mp.exp(w) * mp.log(w)
+                        f[p, q] = complex(fw)
+
+                c = (2.0/n)**2 * T @ f @ T.T
+                c[0, :] *= 0.5
+                c[:, 0] *= 0.5
+                coefs[i, j] = c
+
+    # Discard negligible trailing coefficients.
+    scale = np.abs(coefs).max(axis=(2, 3), keepdims=True)
+    coefs[np.abs(coefs) < 1.0e-17 * scale] = 0.0
+    nonzero = np.nonzero(coefs)
+    nterms = max(nonzero[2].max(), nonzero[3].max()) + 1
+
+    np.savez(filename, breakpoints=breakpoints, coefs=coefs[..., :nterms, :nterms])
+
+
+def load_coefficients(filename=coefs_file):
+    data = np.load(filename)
+
+    return data['breakpoints'], data['coefs']
+
+
+_coefficients = None
+
+
+def get_coefficients():
+    """Coefficients loaded from coefs_file on first use."""
+
+    global _coefficients
+
+    if _coefficients is None:
+        _coefficients = load_coefficients()
+
+    return _coefficients
+
+
+def chebyshev_matrix(t, n):
+    """Chebyshev polynomials T_0 ... T_{n-1} at each t, with shape (n, len(t))."""
+
+    T = np.empty((n, len(t)))
+    T[0] = 1.0
+    if n > 1:
+        T[1] = t
+    for k in range(2, n):
+        T[k] = 2*t*T[k-1] - T[k-2]
+
+    return T
+
+
+def expexp1(X, V3):
+    """exp(-Z) E1(-Z), with Z = V3 - iX, for arrays of X ≥ 0 and V3 ≥ 0."""
+
+    X = np.asarray(X, dtype=np.float64)
+    V3 = np.asarray(V3, dtype=np.float64)
+    X, V3 = np.broadcast_arrays(X, V3)
+    e2 = np.empty(X.shape, dtype=np.complex128)
+
+    table_breakpoints, table_coefs = get_coefficients()
+    bmax = table_breakpoints[-1]
+    table = (X > 0.0) & (X <= bmax) & (V3 <= bmax)
+
+    # Exact formula outside the tabulated range.
+    Ze = V3[~table] - 1j*X[~table]
+    e2[~table] = np.exp(-Ze) * exp1(-Ze)
+
+    x = X[table]
+    v = V3[table]
+    m = len(table_breakpoints) - 1
+    n = table_coefs.shape[-1]
+    i = np.clip(np.searchsorted(table_breakpoints, x, side='right') - 1, 0, m - 1)
+    j = np.clip(np.searchsorted(table_breakpoints, v, side='right') - 1, 0, m - 1)
+
+    # Points grouped by patch.
+    values = np.empty(len(x), dtype=np.complex128)
+    patch = i*m + j
+    order = np.argsort(patch, kind='stable')
+    patches, starts = np.unique(patch[order], return_index=True)
+    for p, k in zip(patches, np.split(order, starts[1:])):
+        a, b = table_breakpoints[p // m], table_breakpoints[p // m + 1]
+        c, d = table_breakpoints[p % m], table_breakpoints[p % m + 1]
+        Tx = chebyshev_matrix((2*x[k] - (b + a)) / (b - a), n)
+        Tv = chebyshev_matrix((2*v[k] - (d + c)) / (d - c), n)
+        C = table_coefs[p // m, p % m]
+        real = np.sum((C.real.T @ Tx) * Tv, axis=0)
+        imag = np.sum((C.imag.T @ Tx) * Tv, axis=0)
+        values[k] = real + 1j*imag
+
+    # Log singularity of the first patch.
+    first = patch == 0
+    w = -v[first] + 1j*x[first]
+    values[first] -= np.exp(w) * np.log(w)
+
+    e2[table] = values
+
+    return e2
+
@@ -1,12 +1,59 @@
 import numpy as np
 from scipy.special import exp1
 from twodubem.green import Green
+import expexp1_table
+import wavekernel
+from wavekernel import tier_names
 
 class FreeSurfaceGreenFunction(Green):
+    """Infinite-depth free-surface Green Function.
+
+    Parameters
+    ----------
+    quadrature : str, default='fixed'
+        Element quadrature: 'fixed', 4-point Gauss-Legendre for every pair,
+        or 'adaptive', with the rule chosen from the distance to element
+        length ratio (see wavekernel.quadrature_rules and
+        wavekernel.quadrature_ratios).
+    singular : str, default='quadrature'
+        Integration of the log part ln r1 + ln r3 of G on self and adjacent
+        elements in the influence matrices: 'quadrature', with the element
+        quadrature, or 'analytical', with the closed form of
+        wavekernel.log_integrals.
+    core : str, default='exact'
+        Core exp(-Z) E1(-Z) of the Green function: 'exact', computed with
+        exp1, or 'table', interpolated from expexp1_table, with a relative
+        error below expexp1_table.max_error. The table is slower than exp1 in
+        the influence matrices (see expexp1_table).
+
+    Attributes
+    ----------
+    quadrature_counters : dict
+        Number of Green function evaluations of each quadrature tier.
+    """
+
+    def __init__(self, quadrature='fixed', singular='quadrature', core='exact'):
+        if quadrature not in ('fixed', 'adaptive'):
+            raise ValueError(f"Invalid quadrature: {quadrature}")
+        if singular not in ('analytical', 'quadrature'):
+            raise ValueError(f"Invalid singular integration: {singular}")
+        if core not in ('exact', 'table'):
+            raise ValueError(f"Invalid core: {core}")
+
+        self.quadrature = quadrature
+        self.singular = singular
+        self.core = core
+        self.quadrature_counters = dict.fromkeys(['fixed'] + tier_names, 0)
 
     @staticmethod
-    def eval(field_point, source_point, K):
-        """Infinite-depth free-surface Green function."""
+    def eval(field_point, source_point, K, order=2, core='exact'):
+        """Infinite-depth free-surface Green function.
+
+        Derivatives up to order are computed: 0 for the value only, 1 for the
+        gradient and 2 for the Hessian. Derivatives not computed are None.
+        The core exp(-Z) E1(-Z) is computed with exp1 for core='exact', or
+        interpolated from expexp1_table for core='table'.
+        """
 
         sx, sz = source_point
         fx, fz = field_point
@@ -42,12 +89,11 @@ class FreeSurfaceGreenFunction(Green):
 
         # Auxilary variables e.
         e1 = np.exp(-Z)
-        e2 = e1*exp1(-Z)
-        e3 = e2 + 1/Z
-        e4 = e3 + 1/Z**2
+        if core == 'table':
+            e2 = expexp1_table.expexp1(X, V3)
+        else:
+            e2 = e1*exp1(-Z)
         e5 = 2*np.pi*e1
-        e6 = K*e5
-        e7 = K*e6
 
         # Auxilary variables s.
         sx1 = np.sign(x1)
@@ -60,10 +106,22 @@ class FreeSurfaceGreenFunction(Green):
             # Far field
             G = np.log(r1/r3) - 2*e2.real - 1j*e5
 
+        if order == 0:
+            return G, None, None
+
+        e3 = e2 + 1/Z
+        e6 = K*e5
+
         Gx = sx1 * (R/d4 - R/d6 + k1*e3.imag + e6)
         Gz = sz1 * v1/d4 + v3/d6 - k1*e3.real - 1j*e6
         gradG = np.array([Gx, Gz], dtype=np.complex128)
 
+        if order == 1:
+            return G, gradG, None
+
+        e4 = e3 + 1/Z**2
+        e7 = K*e6
+
         Gxx = (d2 - d1)/d5 + (d1 - d3)/d7 + k2*e4.real + 1j*e7
         Gzz = -Gxx
         Gxz = -sx1 * (sz1 * v1*d8/d5 + v3*d8/d7 - k2*e4.imag - e7)
@@ -71,7 +129,75 @@ class FreeSurfaceGreenFunction(Green):
 
         return G, gradG, hessG
 
-    def get_line_element_influence_coefficients(self, element, point, K):
+    eval_array = staticmethod(wavekernel.eval_array)
+
+    def get_influence_coefficients(self, field_points, midpoints, normals, lengths, K, derivatives=0, memory=2**27):
+        """Influence coefficients of elements at arrays of field points, with
+        the quadrature of this Green function (see
+        wavekernel.influence_coefficients). The Green function evaluations are
+        added to quadrature_counters."""
+
+        return wavekernel.influence_coefficients(
+            field_points, midpoints, normals, lengths, K, derivatives,
+            quadrature=self.quadrature, counters=self.quadrature_counters, memory=memory, core=self.core,
+        )
+
+    def get_influence_matrices(self, midpoints, normals, lengths, K, memory=2**27):
+        """Influence matrices G and Q of elements at their midpoints, without
+        the jump of Q (see wavekernel.influence_matrices)."""
+
+        return wavekernel.influence_matrices(
+            midpoints, normals, lengths, K,
+            quadrature=self.quadrature,
+            analytical=self.singular == 'analytical',
+            counters=self.quadrature_counters,
+            core=self.core,
+            memory=memory,
+        )
+
+    def get_influence_hmatrices(self, midpoints, normals, lengths, K, jumps, **options):
+        """H-matrices of the influence matrices G and Q, with jumps on the
+        diagonal of Q (see wavekernel.influence_hmatrices)."""
+
+        return wavekernel.influence_hmatrices(
+            midpoints, normals, lengths, K, jumps,
+            quadrature=self.quadrature,
+            analytical=self.singular == 'analytical',
+            counters=self.quadrature_counters,
+            core=self.core,
+            **options,
+        )
+
+    def get_influence_entries(self, i, j, midpoints, normals, lengths, K, jumps):
+        """Entries Q[i, j] of the influence matrix Q, with jumps on the
+        diagonal (see wavekernel.influence_entries)."""
+
+        return wavekernel.influence_entries(
+            i, j, midpoints, normals, lengths, K, jumps,
+            quadrature=self.quadrature,
+            analytical=self.singular == 'analytical',
+            counters=self.quadrature_counters,
+            core=self.core,
+        )
+
+    def get_line_element_influence_coefficients(self, element, point, K, derivatives=1):
+        """Influence coefficients G and Q of an element at a point.
+
+        With derivatives=1, their gradients gradG and gradQ are also computed,
+        and with derivatives=0 they are None. The Green function is evaluated
+        up to the derivative order that is needed.
+        """
+
+        if self.quadrature == 'adaptive':
+            G, Q, gradG, gradQ = self.get_influence_coefficients(
+                np.asarray(point)[np.newaxis], element.node[np.newaxis], element.normal[np.newaxis],
+                np.array([element.length]), K, derivatives,
+            )
+            if derivatives == 0:
+                return G[0, 0], Q[0, 0], None, None
+            return G[0, 0], Q[0, 0], gradG[0, 0], gradQ[0, 0]
+
+        order = derivatives + 1
         a = 0.5 * element.length
 
         # 4-point Gauss-Legendre quadrature roots and weights.
@@ -80,7 +206,7 @@ class FreeSurfaceGreenFunction(Green):
 
         G = 0.0 + 1j * 0.0
         gradG = np.zeros(2, dtype=np.complex128)
-        hessG = np.zeros((2, 2), dtype=np.complex128)
+        hessG = np.zeros((2, 2), dtype=np.complex128) if order == 2 else None
         for i in range(len(roots)):
             element_point_p = element.get_point_global_coordinates(
                 np.array([a * roots[i], 0.0])
@@ -89,15 +215,22 @@ class FreeSurfaceGreenFunction(Green):
                 np.array([-a * roots[i], 0.0])
             )
 
-            g_p, gradg_p, hessg_p = self.eval(element_point_p, point, K)
-            g_m, gradg_m, hessg_m = self.eval(element_point_m, point, K)
+            g_p, gradg_p, hessg_p = self.eval(element_point_p, point, K, order, self.core)
+            g_m, gradg_m, hessg_m = self.eval(element_point_m, point, K, order, self.core)
 
             G += weights[i] * (g_p + g_m)
             gradG += weights[i] * (gradg_p + gradg_m)
-            hessG += weights[i] * (hessg_p + hessg_m)
+            if order == 2:
+                hessG += weights[i] * (hessg_p + hessg_m)
+
+        self.quadrature_counters['fixed'] += 2 * len(roots)
 
         G = a * G
         Q = a * gradG @ element.normal
+
+        if derivatives == 0:
+            return G, Q, None, None
+
         gradG = -a * gradG
         gradQ = -a * hessG @ element.normal
 
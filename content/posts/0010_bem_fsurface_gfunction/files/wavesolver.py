@@ -1,39 +1,133 @@
 import numpy as np
 from twodubem.solver import Solver
 from wavegreen import FreeSurfaceGreenFunction
+import iterative
 
 
 class WaveSolver(Solver):
-    """Solver for the radiation and diffraction problems."""
+    """Solver for the radiation and diffraction problems.
+
+    Parameters
+    ----------
+    body : Polygon
+        Body boundary.
+    w : float
+        Wave frequency.
+    linear_solver : str, default='direct'
+        Linear system solver: 'direct' or 'gmres'.
+    solver_options : dict, default=None
+        Keyword arguments of iterative.solve, such as preconditioner, tol or
+        operator, a matrix-free product with the Q matrix.
+    quadrature : str, default='fixed'
+        Element quadrature of the Green function, see FreeSurfaceGreenFunction.
+    singular : str, default='quadrature'
+        Integration of the log part of G on self and adjacent elements, see
+        FreeSurfaceGreenFunction.
+    assembly : str, default='dense'
+        Influence matrices: 'dense', or 'hmatrix', H-matrices whose blocks
+        are compressed with adaptive cross approximation. With H-matrices, Q
+        is never assembled: GMRES uses products with the H-matrix and the
+        preconditioner evaluates the entries it needs, so linear_solver must
+        be 'gmres'.
+    hmatrix_options : dict, default=None
+        Keyword arguments of hmatrix.build_hmatrix, such as tol, leaf_size or
+        eta.
+    core : str, default='exact'
+        Core of the Green function, 'exact' or 'table', see
+        FreeSurfaceGreenFunction.
+    """
     
-    def __init__(self, body, w):
+    def __init__(
+        self,
+        body,
+        w,
+        linear_solver='direct',
+        solver_options=None,
+        quadrature='fixed',
+        singular='quadrature',
+        assembly='dense',
+        hmatrix_options=None,
+        core='exact',
+    ):
+        if assembly not in ('dense', 'hmatrix'):
+            raise ValueError(f"Invalid assembly: {assembly}")
+        if assembly == 'hmatrix' and linear_solver != 'gmres':
+            raise ValueError("H-matrix assembly requires linear_solver='gmres'")
+
         self.boundary = body
-        self.green = FreeSurfaceGreenFunction()
+        self.green = FreeSurfaceGreenFunction(quadrature, singular, core)
         self.g = 9.81  # Acceleration of gravity
         self.rho = 1.0  # Water density
         self.w = w
         self.K = self.w**2 / self.g
         self.L = 2*np.pi / self.K
+        self.linear_solver = linear_solver
+        self.solver_options = {} if solver_options is None else solver_options
+        self.assembly = assembly
+        self.hmatrix_options = {} if hmatrix_options is None else hmatrix_options
+
+    def _build_influence_matrices(self, memory=2**27):
+        """Build influence coefficients matrices.
 
-    def _build_influence_matrices(self):
-        """Build influence coefficients matrices."""
+        The Green function is evaluated with eval_array, for chunks of source
+        points that fit in memory bytes.
+        """
  
         n = self.boundary.number_of_elements
-        self.G = np.empty((n, n), dtype=np.complex128)
-        self.Q = np.empty((n, n), dtype=np.complex128)
-
-        for i, source_element in enumerate(self.boundary.elements):
-            source_point = source_element.node
-            for j, field_element in enumerate(self.boundary.elements):
-                g, q, _, _ = self.green.get_line_element_influence_coefficients(
-                        field_element,
-                        source_point,
-                        self.K,
+
+        if self.assembly == 'hmatrix':
+            self.G, self.Q = self.green.get_influence_hmatrices(
+                self.boundary.midpoints,
+                self.boundary.normals,
+                self.boundary.lengths,
+                self.K,
+                np.full(n, -np.pi),
+                **self.hmatrix_options,
+            )
+            return
+
+        self.G, self.Q = self.green.get_influence_matrices(
+            self.boundary.midpoints,
+            self.boundary.normals,
+            self.boundary.lengths,
+            self.K,
+            memory=memory,
+        )
+        self.Q[np.diag_indices(n)] += -np.pi
+
+    def _solve_linear_system(self, b):
+        """Solve Q phi = b, with iteration counts and residual histories of
+        the iterative solver in linear_solver_info."""
+
+        if self.linear_solver == 'direct':
+            return np.linalg.solve(self.Q, b)
+        elif self.linear_solver == 'gmres':
+            options = {'points': self.boundary.midpoints, **self.solver_options}
+            if self.assembly == 'hmatrix':
+                phi, self.linear_solver_info = iterative.solve(
+                    self._get_entries, b, **{'operator': self.Q, **options}
                 )
-                self.G[i, j] = g
-                self.Q[i, j] = q
-                if i == j:
-                    self.Q[i, j] += -np.pi
+            else:
+                phi, self.linear_solver_info = iterative.solve(self.Q, b, **options)
+            return phi
+
+        raise ValueError(f"Invalid linear solver: {self.linear_solver}")
+
+    def _get_entries(self, i, j):
+        """Entries Q[i, j] of the influence matrix, for the preconditioner of
+        the H-matrix assembly."""
+
+        n = self.boundary.number_of_elements
+
+        return self.green.get_influence_entries(
+            i,
+            j,
+            self.boundary.midpoints,
+            self.boundary.normals,
+            self.boundary.lengths,
+            self.K,
+            np.full(n, -np.pi),
+        )
 
     def solve_radiation_problem(self):
         """Solve the radiation potential of oscilation in heave."""
@@ -46,7 +140,7 @@ class WaveSolver(Solver):
 
         b = self.G @ self.qr
 
-        self.phi_radiation = np.linalg.solve(self.Q, b)
+        self.phi_radiation = self._solve_linear_system(b)
 
     def solve_diffraction_problem(self):
         """Solve the diffraction potential."""
@@ -64,7 +158,7 @@ class WaveSolver(Solver):
         b = self.G @ self.qd
 
         self.phi_incident = phi
-        self.phi_diffraction = np.linalg.solve(self.Q, b)
+        self.phi_diffraction = self._solve_linear_system(b)
     
     def get_radiation_coefficients(self):
         normals = self.boundary.normals
@@ -76,51 +170,53 @@ class WaveSolver(Solver):
 
         return az, bz
 
-    def get_potentials(self, X, Z):
+    def get_potentials(self, X, Z, gradient=True, memory=2**27):
+        """Radiation and diffraction potentials at arrays of points.
+
+        Their gradients, i.e. the velocities, are only computed if gradient is
+        True, and are None otherwise. Influence coefficients are computed for
+        chunks of points that fit in memory bytes.
+        """
+
         n = self.boundary.number_of_elements
-        x = X.ravel()
-        z = Z.ravel()
-        zr = np.empty(x.shape, dtype=np.complex128)
-        zd = np.empty(x.shape, dtype=np.complex128)
-        wr = np.empty((*x.shape, 2), dtype=np.complex128)
-        wd = np.empty((*x.shape, 2), dtype=np.complex128)
-        G = np.empty(n, dtype=np.complex128)
-        Q = np.empty(n, dtype=np.complex128)
-        gradG = np.empty((2, n), dtype=np.complex128)
-        gradQ = np.empty((2, n), dtype=np.complex128)
+        points = np.column_stack((X.ravel(), Z.ravel()))
+        zr = np.empty(len(points), dtype=np.complex128)
+        zd = np.empty(len(points), dtype=np.complex128)
+        wr = np.empty((len(points), 2), dtype=np.complex128)
+        wd = np.empty((len(points), 2), dtype=np.complex128)
         dpi = 2*np.pi
 
-        for i in range(len(x)):
+        chunk = max(1, memory // ((2 + 4*gradient) * 16 * n))
+        for i in range(0, len(points), chunk):
+            G, Q, gradG, gradQ = self.green.get_influence_coefficients(
+                points[i:i+chunk],
+                self.boundary.midpoints,
+                self.boundary.normals,
+                self.boundary.lengths,
+                self.K,
+                derivatives=int(gradient),
+            )
 
-            field_point = np.array([x[i], z[i]])
-            
-            for j, source_element in enumerate(self.boundary.elements):
-                g, q, gradg, gradq = self.green.get_line_element_influence_coefficients(
-                        source_element,
-                        field_point,
-                        self.K,
-                )
-                G[j] = g
-                Q[j] = q
-                gradG[:, j] = gradg
-                gradQ[:, j] = gradq
-            
-            zr[i] = Q @ self.phi_radiation - G @ self.qr
-            zd[i] = Q @ self.phi_diffraction - G @ self.qd
-    
-            wr[i] = gradQ @ self.phi_radiation - gradG @ self.qr
-            wd[i] = gradQ @ self.phi_diffraction - gradG @ self.qd
+            zr[i:i+chunk] = Q @ self.phi_radiation - G @ self.qr
+            zd[i:i+chunk] = Q @ self.phi_diffraction - G @ self.qd
+
+            if gradient:
+                wr[i:i+chunk] = self.phi_radiation @ gradQ - self.qr @ gradG
+                wd[i:i+chunk] = self.phi_diffraction @ gradQ - self.qd @ gradG
 
         phir = zr.reshape(X.shape) / dpi
         phid = zd.reshape(X.shape) / dpi
         
-        gradphir = wr.reshape((*X.shape, 2)) / dpi
-        gradphid = wd.reshape((*X.shape, 2)) / dpi
+        if gradient:
+            gradphir = wr.reshape((*X.shape, 2)) / dpi
+            gradphid = wd.reshape((*X.shape, 2)) / dpi
+        else:
+            gradphir = gradphid = None
         
         return phir, phid, gradphir, gradphid
     
     def get_wave_amplitude(self):
-        phir, _, _, _ = self.get_potentials(np.array([2.0*self.L]), np.array([0.0]))
+        phir, _, _, _ = self.get_potentials(np.array([2.0*self.L]), np.array([0.0]), gradient=False)
 
         zeta = np.abs(1j * phir[0]) * self.w / self.g
 
@@ -1,6 +1,9 @@
 import numpy as np
+from scipy.linalg import lu_factor
 from scipy.special import exp1
 from twodubem.green import Green
+import wavekernel
+from wavekernel import tier_names
 
 class FreeSurface(Green):
     """Infinite-depth free-surface Green Function.
@@ -11,18 +14,80 @@ class FreeSurface(Green):
         Wave frequency.
     body : Polygon, default=None
         Body to compute influence matrices.
+    backend : str, default='numpy'
+        Element influence coefficients and influence matrices back end:
+        'numpy' or 'numba', the compiled version in wavegreen_numba.
+    quadrature : str, default='fixed'
+        Element quadrature: 'fixed', 4-point Gauss-Legendre for every pair,
+        or 'adaptive', with the rule chosen from the distance to element
+        length ratio (see wavekernel.quadrature_rules and
+        wavekernel.quadrature_ratios).
+    singular : str, default='quadrature'
+        Integration of the log part ln r1 + ln r3 of G on self and adjacent
+        elements in the influence matrices: 'quadrature', with the element
+        quadrature, or 'analytical', with the closed form of
+        wavekernel.log_integrals, which also covers the log singularity of
+        the wave part of Q on the interior free surface.
+    assembly : str, default='dense'
+        Influence matrices: 'dense', or 'hmatrix', H-matrices whose blocks are
+        compressed with adaptive cross approximation (see
+        wavekernel.influence_hmatrices). H-matrices are only available with
+        the numpy back end, and are solved with GMRES, as they have no LU
+        factorization.
+    hmatrix_options : dict, default=None
+        Keyword arguments of hmatrix.build_hmatrix, such as tol, leaf_size or
+        eta.
+
+    Attributes
+    ----------
+    quadrature_counters : dict
+        Number of Green function evaluations of each quadrature tier.
+    lu : tuple
+        LU factorization of Q, computed on first use and shared by all
+        solvers of this Green function.
     """
     
-    def __init__(self, w, body=None):
+    def __init__(
+        self,
+        w,
+        body=None,
+        backend='numpy',
+        quadrature='fixed',
+        singular='quadrature',
+        assembly='dense',
+        hmatrix_options=None,
+    ):
+        if quadrature not in ('fixed', 'adaptive'):
+            raise ValueError(f"Invalid quadrature: {quadrature}")
+        if singular not in ('analytical', 'quadrature'):
+            raise ValueError(f"Invalid singular integration: {singular}")
+        if backend == 'numba' and quadrature == 'adaptive':
+            raise ValueError("Adaptive quadrature is not available with the numba backend")
+        if assembly not in ('dense', 'hmatrix'):
+            raise ValueError(f"Invalid assembly: {assembly}")
+        if backend == 'numba' and assembly == 'hmatrix':
+            raise ValueError("H-matrix assembly is not available with the numba backend")
+
         self.w = w
         self.g = 9.81
         self.K = w**2 / self.g
+        self.backend = backend
+        self.quadrature = quadrature
+        self.singular = singular
+        self.assembly = assembly
+        self.hmatrix_options = {} if hmatrix_options is None else hmatrix_options
+        self._lu = None
+        self.quadrature_counters = dict.fromkeys(['fixed'] + tier_names, 0)
         if body is not None:
             self._build_influence_matrices(body)
     
     @staticmethod
-    def eval(field_point, source_point, K):
-        """Infinite-depth free-surface Green function."""
+    def eval(field_point, source_point, K, order=2):
+        """Infinite-depth free-surface Green function.
+
+        Derivatives up to order are computed: 0 for the value only, 1 for the
+        gradient and 2 for the Hessian. Derivatives not computed are None.
+        """
 
         sx, sz = source_point
         fx, fz = field_point
@@ -59,11 +124,7 @@ class FreeSurface(Green):
         # Auxilary variables e.
         e1 = np.exp(-Z)
         e2 = e1*exp1(-Z)
-        e3 = e2 + 1/Z
-        e4 = e3 + 1/Z**2
         e5 = 2*np.pi*e1
-        e6 = K*e5
-        e7 = K*e6
 
         # Auxilary variables s.
         sx1 = np.sign(x1)
@@ -76,10 +137,22 @@ class FreeSurface(Green):
             # Far field
             G = np.log(r1/r3) - 2*e2.real - 1j*e5
 
+        if order == 0:
+            return G, None, None
+
+        e3 = e2 + 1/Z
+        e6 = K*e5
+
         Gx = sx1 * (R/d4 - R/d6 + k1*e3.imag + e6)
         Gz = sz1 * v1/d4 + v3/d6 - k1*e3.real - 1j*e6
         gradG = np.array([Gx, Gz], dtype=np.complex128)
 
+        if order == 1:
+            return G, gradG, None
+
+        e4 = e3 + 1/Z**2
+        e7 = K*e6
+
         Gxx = (d2 - d1)/d5 + (d1 - d3)/d7 + k2*e4.real + 1j*e7
         Gzz = -Gxx
         Gxz = -sx1 * (sz1 * v1*d8/d5 + v3*d8/d7 - k2*e4.imag - e7)
@@ -87,7 +160,49 @@ class FreeSurface(Green):
 
         return G, gradG, hessG
 
-    def get_element_influence_coefficients(self, element, point):
+    eval_array = staticmethod(wavekernel.eval_array)
+
+    def get_influence_coefficients(self, field_points, midpoints, normals, lengths, derivatives=0, memory=2**27):
+        """Influence coefficients of elements at arrays of field points, with
+        the quadrature of this Green function (see
+        wavekernel.influence_coefficients). The Green function evaluations are
+        added to quadrature_counters. The numba back end uses the same NumPy
+        version."""
+
+        return wavekernel.influence_coefficients(
+            field_points, midpoints, normals, lengths, self.K, derivatives,
+            quadrature=self.quadrature, counters=self.quadrature_counters, memory=memory,
+        )
+
+    def get_element_influence_coefficients(self, element, point, derivatives=1):
+        """Influence coefficients G and Q of an element at a point.
+
+        With derivatives=1, their gradients gradG and gradQ are also computed,
+        and with derivatives=0 they are None. The Green function is evaluated
+        up to the derivative order that is needed.
+        """
+
+        if self.backend == 'numba':
+            import wavegreen_numba
+
+            G, Q, gradG, gradQ = wavegreen_numba.element_influence_coefficients(
+                element.node, element.normal, element.length, point, self.K, derivatives
+            )
+            self.quadrature_counters['fixed'] += 2 * len(wavegreen_numba.roots)
+            if derivatives == 0:
+                return G, Q, None, None
+            return G, Q, gradG, gradQ
+
+        if self.quadrature == 'adaptive':
+            G, Q, gradG, gradQ = self.get_influence_coefficients(
+                np.asarray(point)[np.newaxis], element.node[np.newaxis], element.normal[np.newaxis],
+                np.array([element.length]), derivatives,
+            )
+            if derivatives == 0:
+                return G[0, 0], Q[0, 0], None, None
+            return G[0, 0], Q[0, 0], gradG[0, 0], gradQ[0, 0]
+
+        order = derivatives + 1
         a = 0.5 * element.length
 
         # 4-point Gauss-Legendre quadrature roots and weights.
@@ -96,7 +211,7 @@ class FreeSurface(Green):
 
         G = 0.0 + 1j*0.0
         gradG = np.zeros(2, dtype=np.complex128)
-        hessG = np.zeros((2, 2), dtype=np.complex128)
+        hessG = np.zeros((2, 2), dtype=np.complex128) if order == 2 else None
         for i in range(len(roots)):
             element_point_p = element.get_point_global_coordinates(
                 np.array([a * roots[i], 0.0])
@@ -105,36 +220,108 @@ class FreeSurface(Green):
                 np.array([-a * roots[i], 0.0])
             )
 
-            g_p, gradg_p, hessg_p = self.eval(element_point_p, point, self.K)
-            g_m, gradg_m, hessg_m = self.eval(element_point_m, point, self.K)
+            g_p, gradg_p, hessg_p = self.eval(element_point_p, point, self.K, order)
+            g_m, gradg_m, hessg_m = self.eval(element_point_m, point, self.K, order)
 
             G += weights[i] * (g_p + g_m)
             gradG += weights[i] * (gradg_p + gradg_m)
-            hessG += weights[i] * (hessg_p + hessg_m)
+            if order == 2:
+                hessG += weights[i] * (hessg_p + hessg_m)
+
+        self.quadrature_counters['fixed'] += 2 * len(roots)
 
         G = a * G
         Q = a * gradG @ element.normal
+
+        if derivatives == 0:
+            return G, Q, None, None
+
         gradG = -a * gradG
         gradQ = -a * hessG @ element.normal
 
         return G, Q, gradG, gradQ
 
-    def _build_influence_matrices(self, body):
-        n = body.number_of_elements
-        self.G = np.empty((n, n), dtype=np.complex128)
-        self.Q = np.empty((n, n), dtype=np.complex128)
-
-        for i, source_element in enumerate(body.elements):
-            source_point = source_element.node
-            for j, field_element in enumerate(body.elements):
-                g, q, _, _ = self.get_element_influence_coefficients(
-                        field_element,
-                        source_point,
+    def get_influence_entries(self, i, j, body):
+        """Entries Q[i, j] of the influence matrix of body, with the jumps,
+        for index arrays i and j (see wavekernel.influence_entries)."""
+
+        return wavekernel.influence_entries(
+            i, j, body.midpoints, body.normals, body.lengths, self.K, self._get_jumps(body),
+            quadrature=self.quadrature,
+            analytical=self.singular == 'analytical',
+            counters=self.quadrature_counters,
+        )
+
+    @staticmethod
+    def _get_jumps(body):
+        """Jumps of Q: -π on the body and 2π on the interior free surface."""
+
+        jumps = np.full(body.number_of_elements, 2*np.pi)
+        jumps[:body.number_of_body_elements] = -np.pi
+
+        return jumps
+
+    @property
+    def lu(self):
+        if self.assembly == 'hmatrix':
+            raise ValueError("H-matrices have no LU factorization, use linear_solver='gmres'")
+        if self._lu is None:
+            self._lu = lu_factor(self.Q)
+
+        return self._lu
+
+    def _build_influence_matrices(self, body, memory=2**27):
+        """Build G and Q with wavekernel.influence_matrices, or with the
+        compiled version of the numba back end."""
+
+        self._lu = None
+
+        if self.backend == 'numba':
+            import wavegreen_numba
+
+            self.G, self.Q = wavegreen_numba.build_influence_matrices(
+                np.ascontiguousarray(body.midpoints, dtype=np.float64),
+                np.ascontiguousarray(body.normals, dtype=np.float64),
+                np.ascontiguousarray(body.lengths, dtype=np.float64),
+                self.K,
+                body.number_of_body_elements,
+            )
+            n = body.number_of_elements
+            self.quadrature_counters['fixed'] += 2 * len(wavegreen_numba.roots) * n**2
+            if self.singular == 'analytical':
+                wavekernel.add_log_part_correction(
+                    self.G, self.Q, body.midpoints, body.normals, body.lengths, self.K
                 )
-                self.G[i, j] = g
-                self.Q[i, j] = q
-                if i == j:
-                    if i < body.number_of_body_elements:
-                        self.Q[i, j] += -np.pi
-                    else:
-                        self.Q[i, j] += 2*np.pi
\ No newline at end of file
+            return
+
+        if self.assembly == 'hmatrix':
+            self.G, self.Q = wavekernel.influence_hmatrices(
+                body.midpoints,
+                body.normals,
+                body.lengths,
+                self.K,
+                self._get_jumps(body),
+                quadrature=self.quadrature,
+                analytical=self.singular == 'analytical',
+                counters=self.quadrature_counters,
+                **self.hmatrix_options,
+            )
+            return
+
+        n = body.number_of_elements
+        diagonal = np.arange(n)
+        nb = body.number_of_body_elements
+
+        self.G, self.Q = wavekernel.influence_matrices(
+            body.midpoints,
+            body.normals,
+            body.lengths,
+            self.K,
+            quadrature=self.quadrature,
+            analytical=self.singular == 'analytical',
+            counters=self.quadrature_counters,
+            memory=memory,
+        )
+
+        self.Q[diagonal[:nb], diagonal[:nb]] += -np.pi
+        self.Q[diagonal[nb:], diagonal[nb:]] += 2*np.pi
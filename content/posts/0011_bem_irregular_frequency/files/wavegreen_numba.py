@@ -0,0 +1,251 @@
+"""Numba compiled infinite-depth free-surface Green function.
+
+Compiled version of FreeSurface.eval, get_element_influence_coefficients and
+_build_influence_matrices, with its own complex exponential integral, so that
+no call goes back to SciPy.
+
+The single element function is about 20 times faster than the Python one
+(4 µs against 100 µs per call). The assembly competes with the NumPy version,
+which already evaluates exp1 over arrays, and on one core it is only about
+1.2 to 1.4 times faster (0.22 s against 0.31 s for 327 elements, 0.56 s
+against 0.66 s for 490). Both spend most of the time in the same series and
+continued fraction of E1, so compiling only removes the array temporaries.
+The assembly runs rows in parallel with prange, which is where a larger
+speedup over the NumPy version is expected, but it has only been timed on a
+single core; set numba.set_num_threads to measure its scaling.
+"""
+
+import numpy as np
+import numba
+
+pi = np.pi
+gm = 0.5772156649015329  # Euler's constant
+
+# 4-point Gauss-Legendre quadrature roots and weights.
+roots = np.array([0.3399810435848563, 0.8611363115940526])
+weights = np.array([0.6521451548625461, 0.3478548451374538])
+
+
+@numba.njit(cache=True)
+def expexp1(z):
+    """exp(z) * E1(z) for complex z.
+
+    Same algorithm as the complex exp1 of SciPy: power series for |z| ≤ 5
+    and in the wedge Re(z) < -2|Im(z)| up to |z| = 40, where the continued
+    fraction converges slowly, and continued fraction elsewhere. On the
+    negative real axis, the sign of the imaginary zero selects the branch.
+    """
+
+    x = z.real
+    y = z.imag
+    a0 = abs(z)
+
+    if a0 == 0.0:
+        return complex(1.0e+300, 0.0)
+
+    if a0 <= 5.0 or (x < -2*abs(y) and a0 < 40.0):
+        # Power series.
+        ce1 = 1.0 + 0.0j
+        cr = 1.0 + 0.0j
+        for k in range(1, 501):
+            cr = -cr * k * z / (k + 1.0)**2
+            ce1 = ce1 + cr
+            if abs(cr) <= abs(ce1) * 1.0e-15:
+                break
+
+        if x <= 0.0 and y == 0.0:
+            ce1 = -gm - np.log(-z) + z*ce1 - np.copysign(pi, y)*1j
+        else:
+            ce1 = -gm - np.log(z) + z*ce1
+
+        return np.exp(z) * ce1
+
+    # Continued fraction, https://dlmf.nist.gov/6.9
+    zd = 1.0 / z
+    zdc = zd
+    zc = zdc
+    for k in range(1, 501):
+        zd = 1.0 / (zd*k + 1.0)
+        zdc = (zd - 1.0) * zdc
+        zc = zc + zdc
+
+        zd = 1.0 / (zd*k + z)
+        zdc = (z*zd - 1.0) * zdc
+        zc = zc + zdc
+        if abs(zdc) <= abs(zc) * 1.0e-15 and k > 20:
+            break
+
+    if x <= 0.0 and y == 0.0:
+        zc = zc - pi * 1j * np.exp(z)
+
+    return zc
+
+
+@numba.njit(cache=True)
+def eval_green(fx, fz, sx, sz, K, order):
+    """Infinite-depth free-surface Green function, as in FreeSurface.eval.
+
+    Returns
+    -------
+    G, Gx, Gz, Gxx, Gxz : complex
+        Green function, gradient and Hessian components, with Gzz = -Gxx.
+        Derivatives above order are zero.
+    """
+
+    x1 = fx - sx
+    z1 = fz - sz
+    z3 = fz + sz
+
+    R = abs(x1)
+    v1 = abs(z1)
+    v3 = abs(z3)
+
+    # Auxilary variables d.
+    d1 = R**2
+    d2 = v1**2
+    d3 = v3**2
+    d4 = d1 + d2
+    d5 = d4**2
+    d6 = d1 + d3
+    d7 = d6**2
+    d8 = 2*R
+
+    r1 = np.sqrt(d4)
+    r3 = np.sqrt(d6)
+
+    X = K*R
+    V3 = K*v3
+    Z = complex(V3, -X)
+
+    # Auxilary variables k.
+    k1 = 2*K
+    k2 = k1*K
+
+    # Auxilary variables e.
+    e1 = np.exp(-Z)
+    e2 = expexp1(-Z)
+    e5 = 2*pi*e1
+
+    # Auxilary variables s.
+    sx1 = np.sign(x1)
+    sz1 = np.sign(z1)
+
+    if X <= 1:
+        # Near field
+        G = np.log(K*r1) + np.log(K*r3) - 2 * (e2.real + np.log(abs(Z))) - 1j*e5
+    else:
+        # Far field
+        G = np.log(r1/r3) - 2*e2.real - 1j*e5
+
+    Gx = 0.0j
+    Gz = 0.0j
+    Gxx = 0.0j
+    Gxz = 0.0j
+
+    if order >= 1:
+        e3 = e2 + 1/Z
+        e6 = K*e5
+        Gx = sx1 * (R/d4 - R/d6 + k1*e3.imag + e6)
+        Gz = sz1 * v1/d4 + v3/d6 - k1*e3.real - 1j*e6
+
+        if order >= 2:
+            e4 = e3 + 1/Z**2
+            e7 = K*e6
+            Gxx = (d2 - d1)/d5 + (d1 - d3)/d7 + k2*e4.real + 1j*e7
+            Gxz = -sx1 * (sz1 * v1*d8/d5 + v3*d8/d7 - k2*e4.imag - e7)
+
+    return G, Gx, Gz, Gxx, Gxz
+
+
+@numba.njit(cache=True)
+def element_integrals(node, normal, length, point, K, derivatives):
+    """Influence coefficients of an element at a point, and their gradients
+    if derivatives is 1, as complex scalars.
+
+    Returns
+    -------
+    G, Q, Gx, Gz, Qx, Qz : complex
+        Influence coefficients and gradients' components, zero if
+        derivatives is 0.
+    """
+
+    a = 0.5 * length
+    tx = -normal[1]
+    tz = normal[0]
+    order = derivatives + 1
+
+    G = 0.0j
+    Gx = 0.0j
+    Gz = 0.0j
+    Gxx = 0.0j
+    Gxz = 0.0j
+    for i in range(len(roots)):
+        for s in (1.0, -1.0):
+            px = node[0] + s * a * roots[i] * tx
+            pz = node[1] + s * a * roots[i] * tz
+            g, gx, gz, gxx, gxz = eval_green(px, pz, point[0], point[1], K, order)
+            G += weights[i] * g
+            Gx += weights[i] * gx
+            Gz += weights[i] * gz
+            Gxx += weights[i] * gxx
+            Gxz += weights[i] * gxz
+
+    Q = a * (Gx * normal[0] + Gz * normal[1])
+    G = a * G
+
+    if derivatives == 0:
+        return G, Q, 0.0j, 0.0j, 0.0j, 0.0j
+
+    Qx = -a * (Gxx * normal[0] + Gxz * normal[1])
+    Qz = -a * (Gxz * normal[0] - Gxx * normal[1])
+
+    return G, Q, -a * Gx, -a * Gz, Qx, Qz
+
+
+@numba.njit(cache=True)
+def element_influence_coefficients(node, normal, length, point, K, derivatives):
+    """Influence coefficients of an element at a point, as in
+    FreeSurface.get_element_influence_coefficients.
+
+    Returns
+    -------
+    G, Q : complex
+        Influence coefficients.
+    gradG, gradQ : numpy.ndarray
+        Gradients, zero if derivatives is 0.
+    """
+
+    G, Q, Gx, Gz, Qx, Qz = element_integrals(node, normal, length, point, K, derivatives)
+
+    gradG = np.array([Gx, Gz])
+    gradQ = np.array([Qx, Qz])
+
+    return G, Q, gradG, gradQ
+
+
+@numba.njit(parallel=True, cache=True)
+def build_influence_matrices(midpoints, normals, lengths, K, number_of_body_elements):
+    """Influence matrices G and Q, as in FreeSurface._build_influence_matrices.
+
+    Rows, i.e. source points, are distributed over threads. Pairs are
+    integrated with scalar accumulators, so the loop allocates no arrays.
+    """
+
+    n = midpoints.shape[0]
+    G = np.empty((n, n), dtype=np.complex128)
+    Q = np.empty((n, n), dtype=np.complex128)
+
+    for i in numba.prange(n):
+        for j in range(n):
+            g, q, _, _, _, _ = element_integrals(
+                midpoints[j], normals[j], lengths[j], midpoints[i], K, 0
+            )
+            G[i, j] = g
+            Q[i, j] = q
+
+        if i < number_of_body_elements:
+            Q[i, i] += -pi
+        else:
+            Q[i, i] += 2*pi
+
+    return G, Q
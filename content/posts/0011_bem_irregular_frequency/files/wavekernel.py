@@ -0,0 +1,581 @@
+import sys
+from pathlib import Path
+import numpy as np
+from scipy.special import exp1
+
+eps = np.finfo(np.float64).eps
+
+
+def eval_array(field_points, source_points, K, order=2, pairwise=False):
+    """Infinite-depth free-surface Green function for arrays of points.
+
+    Parameters
+    ----------
+    field_points : numpy.ndarray
+        Field points with shape (M, 2).
+    source_points : numpy.ndarray
+        Source points with shape (N, 2).
+    K : float
+        Wave number.
+    order : int, default=2
+        Highest derivative order: 0 for the value only, 1 for the
+        gradient and 2 for the Hessian. Derivatives not computed are None.
+    pairwise : bool, default=False
+        If True, field and source points have the same shape (P, 2) and
+        are evaluated pair by pair, so arrays have shape (P, ...).
+
+    Returns
+    -------
+    G : numpy.ndarray
+        Green function with shape (M, N).
+    gradG : numpy.ndarray
+        Gradient with shape (M, N, 2).
+    hessG : numpy.ndarray
+        Hessian with shape (M, N, 2, 2).
+    """
+
+    if pairwise:
+        fx, fz = field_points.T
+        sx, sz = source_points.T
+    else:
+        fx = field_points[:, np.newaxis, 0]
+        fz = field_points[:, np.newaxis, 1]
+        sx = source_points[np.newaxis, :, 0]
+        sz = source_points[np.newaxis, :, 1]
+
+    x1 = fx - sx
+    z1 = fz - sz
+    z3 = fz + sz
+
+    R = np.abs(x1)
+    v1 = np.abs(z1)
+    v3 = np.abs(z3)
+
+    # Auxilary variables d.
+    d1 = R**2
+    d2 = v1**2
+    d3 = v3**2
+    d4 = d1 + d2
+    d5  = d4**2
+    d6 = d1 + d3
+    d7 = d6**2
+    d8 = 2*R
+
+    X = K*R
+    V3 = K*v3
+    Z = V3 - 1j*X
+
+    # Auxilary variables k.
+    k1 = 2*K
+    k2 = k1*K
+
+    # Auxilary variables e.
+    e1 = np.exp(-Z)
+    e2 = e1*exp1(-Z)
+    e5 = 2*np.pi*e1
+
+    # Auxilary variables s.
+    sx1 = np.sign(x1)
+    sz1 = np.sign(z1)
+
+    G = -2*e2.real - 1j*e5
+
+    # Near field
+    near = X <= 1
+    r1 = np.sqrt(d4[near])
+    r3 = np.sqrt(d6[near])
+    G[near] += np.log(K*r1) + np.log(K*r3) - 2*np.log(np.abs(Z[near]))
+
+    # Far field
+    far = ~near
+    r1 = np.sqrt(d4[far])
+    r3 = np.sqrt(d6[far])
+    G[far] += np.log(r1/r3)
+
+    if order == 0:
+        return G, None, None
+
+    e3 = e2 + 1/Z
+    e6 = K*e5
+
+    gradG = np.empty((*G.shape, 2), dtype=np.complex128)
+    gradG[..., 0] = sx1 * (R/d4 - R/d6 + k1*e3.imag + e6)
+    gradG[..., 1] = sz1 * v1/d4 + v3/d6 - k1*e3.real - 1j*e6
+
+    if order == 1:
+        return G, gradG, None
+
+    e4 = e3 + 1/Z**2
+    e7 = K*e6
+
+    hessG = np.empty((*G.shape, 2, 2), dtype=np.complex128)
+    hessG[..., 0, 0] = (d2 - d1)/d5 + (d1 - d3)/d7 + k2*e4.real + 1j*e7
+    hessG[..., 1, 1] = -hessG[..., 0, 0]
+    hessG[..., 0, 1] = -sx1 * (sz1 * v1*d8/d5 + v3*d8/d7 - k2*e4.imag - e7)
+    hessG[..., 1, 0] = hessG[..., 0, 1]
+
+    return G, gradG, hessG
+
+
+def subdivided_gauss_rule(edges, n=4):
+    """n-point Gauss-Legendre rule on each subinterval of [-1, 1] between edges."""
+
+    x, w = np.polynomial.legendre.leggauss(n)
+    h = 0.5*np.diff(edges)
+    c = 0.5*(edges[1:] + edges[:-1])
+
+    return (c[:, np.newaxis] + h[:, np.newaxis]*x).ravel(), (h[:, np.newaxis]*w).ravel()
+
+
+# Quadrature rules on [-1, 1] of the distance adaptive quadrature tiers. Near
+# pairs use 4 sub-elements and self pairs, with the log singularity at the
+# midpoint, use sub-elements graded towards it. The fixed quadrature uses the
+# 'near' rule, 4-point Gauss-Legendre, for every pair.
+tier_names = ['far', 'mid', 'near', 'subdivided', 'self']
+quadrature_rules = {
+    'far': np.polynomial.legendre.leggauss(1),
+    'mid': np.polynomial.legendre.leggauss(2),
+    'near': np.polynomial.legendre.leggauss(4),
+    'subdivided': subdivided_gauss_rule(np.linspace(-1.0, 1.0, 5)),
+    'self': subdivided_gauss_rule(np.array([-1.0, -0.5, -0.25, -0.125, 0.0, 0.125, 0.25, 0.5, 1.0])),
+}
+
+# Smallest ratio r of distance to element length of the far, mid and near
+# tiers. An n-point rule has a relative error of about (4 r)^(-2n), so these
+# ratios give about 1e-6.
+quadrature_ratios = {'far': 250.0, 'mid': 8.0, 'near': 1.5}
+
+
+def quadrature_tiers(ratio):
+    """Tier index, in tier_names, of each distance to element length ratio."""
+
+    return np.select(
+        [
+            ratio >= quadrature_ratios['far'],
+            ratio >= quadrature_ratios['mid'],
+            ratio >= quadrature_ratios['near'],
+        ],
+        [0, 1, 2],
+        default=3,
+    )
+
+
+# Pairs with a distance to element length ratio below analytical_ratio, i.e.
+# self and adjacent elements, have the log part of G integrated analytically.
+analytical_ratio = 2.0
+
+
+def is_close(points, midpoints, lengths):
+    """Whether points, or their images about the free surface, are closer to
+    the elements' midpoints than analytical_ratio element lengths."""
+
+    images = points * [1.0, -1.0]
+    distance = np.minimum(
+        np.linalg.norm(points - midpoints, axis=-1),
+        np.linalg.norm(images - midpoints, axis=-1),
+    )
+
+    return distance < analytical_ratio * lengths
+
+
+def log_integrals(points, midpoints, normals, lengths):
+    """Integrals of ln r and of its normal derivative over elements, pair by
+    pair, in closed form, with r the distance from the element to the point.
+
+    Parameters
+    ----------
+    points : numpy.ndarray
+        Points' coordinates with shape (..., 2).
+    midpoints : numpy.ndarray
+        Elements' midpoints with shape (..., 2).
+    normals : numpy.ndarray
+        Elements' normals with shape (..., 2).
+    lengths : numpy.ndarray
+        Elements' lengths with shape (...).
+
+    Returns
+    -------
+    L : numpy.ndarray
+        Integral of ln r over the element.
+    dL : numpy.ndarray
+        Integral of the normal derivative of ln r over the element.
+    """
+
+    dif = points - midpoints
+
+    # Points' local coordinates, with tangent = (-ny, nx).
+    x = -dif[..., 0]*normals[..., 1] + dif[..., 1]*normals[..., 0]
+    y = dif[..., 0]*normals[..., 0] + dif[..., 1]*normals[..., 1]
+
+    a = 0.5*lengths
+    xma = x - a
+    xpa = x + a
+    r1 = xma**2 + y**2
+    r2 = xpa**2 + y**2
+    t1 = np.arctan2(y, xma)
+    t2 = np.arctan2(y, xpa)
+
+    # At the element end points, x*log(x) → 0 as x → 0.
+    r1 = np.where(r1 > 0.0, r1, 1.0)
+    r2 = np.where(r2 > 0.0, r2, 1.0)
+
+    L = 0.5 * (2*y*(t1 - t2) - xma*np.log(r1) + xpa*np.log(r2) - 4*a)
+
+    # dL is discontinuous in |x| < a and y = 0, where the jump is added to Q.
+    dL = np.where(np.abs(y) <= lengths*eps, 0.0, t2 - t1)
+
+    return L, dL
+
+
+def log_part_correction(points, midpoints, normals, lengths, K, roots, weights):
+    """Correction of G and Q, pair by pair, that replaces the quadrature of
+    the log part ln r1 + ln r3 of the Green function with its closed form.
+
+    The z derivative of the wave part, -2K Re(exp(-Z) E1(-Z)), has the log
+    singularity 2K ln r3, which only matters for points and elements on the
+    free surface, such as the interior free surface (lid) elements. Its
+    contribution 2K nz ln r3 to Q is also integrated in closed form.
+
+    Parameters
+    ----------
+    points : numpy.ndarray
+        Source points' coordinates with shape (P, 2).
+    midpoints, normals : numpy.ndarray
+        Elements' midpoints and normals with shape (P, 2).
+    lengths : numpy.ndarray
+        Elements' lengths with shape (P,).
+    K : float
+        Wave number.
+    roots, weights : numpy.ndarray
+        Quadrature rule on [-1, 1] used for the pairs.
+
+    Returns
+    -------
+    dG, dQ : numpy.ndarray
+        Corrections with shape (P,).
+    """
+
+    a = 0.5*lengths
+    tangents = np.column_stack((-normals[:, 1], normals[:, 0]))
+    images = points * [1.0, -1.0]
+
+    dG = np.zeros(len(points))
+    dQ = np.zeros(len(points))
+    for c in (points, images):
+        L, dL = log_integrals(c, midpoints, normals, lengths)
+
+        # Quadrature of ln r and of its normal derivative.
+        r = midpoints[:, np.newaxis] + a[:, np.newaxis, np.newaxis]*roots[:, np.newaxis]*tangents[:, np.newaxis]
+        r = r - c[:, np.newaxis]
+        r2 = np.sum(r**2, axis=-1)
+        Lq = a * (0.5*np.log(r2) @ weights)
+        dLq = a * ((np.sum(r * normals[:, np.newaxis], axis=-1) / r2) @ weights)
+
+        dG += L - Lq
+        dQ += dL - dLq
+
+    # Wave part of Q, with L - Lq of the images.
+    dQ += 2*K * normals[:, 1] * (L - Lq)
+
+    return dG, dQ
+
+
+def add_log_part_correction(G, Q, midpoints, normals, lengths, K):
+    """Replace the 4-point quadrature of the log part of G and Q with its
+    closed form for close pairs of influence matrices, in place."""
+
+    close = is_close(midpoints[:, np.newaxis], midpoints[np.newaxis], lengths[np.newaxis])
+    i, j = np.nonzero(close)
+    dG, dQ = log_part_correction(
+        midpoints[i], midpoints[j], normals[j], lengths[j], K, *quadrature_rules['near'],
+    )
+    G[i, j] += dG
+    Q[i, j] += dQ
+
+
+def influence_coefficients(
+    field_points,
+    midpoints,
+    normals,
+    lengths,
+    K,
+    derivatives=0,
+    quadrature='fixed',
+    analytical=False,
+    counters=None,
+    memory=2**27,
+    pairwise=False,
+    normal_derivative=True,
+):
+    """Influence coefficients of elements at field points.
+
+    With quadrature='adaptive', the quadrature rule of each pair is chosen
+    from its distance to element length ratio, and with quadrature='fixed'
+    every pair uses the 4-point Gauss-Legendre rule. Pairs are grouped by rule
+    and each group is evaluated in batches that fit in memory bytes.
+
+    Parameters
+    ----------
+    field_points : numpy.ndarray
+        Field points with shape (M, 2). A field point at an element's
+        midpoint is a self pair of the adaptive quadrature.
+    midpoints : numpy.ndarray
+        Elements' midpoints with shape (N, 2).
+    normals : numpy.ndarray
+        Elements' normals with shape (N, 2).
+    lengths : numpy.ndarray
+        Elements' lengths with shape (N,).
+    K : float
+        Wave number.
+    derivatives : int, default=0
+        0 for G and Q, 1 also for their gradients.
+    quadrature : str, default='fixed'
+        Element quadrature: 'fixed' or 'adaptive'.
+    analytical : bool, default=False
+        If True, the log part of G is integrated analytically for close
+        pairs (see is_close). Gradients are not corrected.
+    counters : dict, default=None
+        Number of Green function evaluations of each quadrature tier, or
+        of 'fixed', updated with the evaluations of this call.
+    pairwise : bool, default=False
+        If True, field points and elements have the same length P and are
+        evaluated pair by pair, so arrays have shape (P, ...).
+    normal_derivative : bool, default=True
+        If False, Q and gradQ are None, and the Green function is evaluated
+        up to the order that G, or gradG, needs.
+
+    Returns
+    -------
+    G, Q : numpy.ndarray
+        Influence coefficients with shape (M, N).
+    gradG, gradQ : numpy.ndarray
+        Gradients with shape (M, N, 2), or None if derivatives is 0.
+    """
+
+    if pairwise:
+        shape = (len(field_points),)
+        I = J = np.arange(len(field_points))
+    else:
+        shape = (len(field_points), len(midpoints))
+        I, J = (index.ravel() for index in np.indices(shape))
+
+    order = derivatives + int(normal_derivative)
+
+    a = 0.5 * lengths
+    tangents = np.column_stack((-normals[:, 1], normals[:, 0]))
+
+    if quadrature == 'adaptive':
+        distance = np.linalg.norm(field_points[I] - midpoints[J], axis=-1)
+        tiers = quadrature_tiers(distance / lengths[J])
+        tiers[distance <= eps * lengths[J]] = tier_names.index('self')
+        groups = [(name, np.nonzero(tiers == tier)[0]) for tier, name in enumerate(tier_names)]
+    elif quadrature == 'fixed':
+        groups = [('fixed', np.arange(len(I)))]
+    else:
+        raise ValueError(f"Invalid quadrature: {quadrature}")
+
+    G = np.empty(len(I), dtype=np.complex128)
+    Q = np.empty(len(I), dtype=np.complex128) if normal_derivative else None
+    gradG = np.empty((len(I), 2), dtype=np.complex128) if derivatives else None
+    gradQ = np.empty((len(I), 2), dtype=np.complex128) if derivatives and normal_derivative else None
+
+    for name, P in groups:
+        roots, weights = quadrature_rules['near' if name == 'fixed' else name]
+        k = len(roots)
+        chunk = max(1, memory // ((3 + 4*derivatives) * 16 * k))
+
+        for c in range(0, len(P), chunk):
+            p = P[c:c+chunk]
+            i = I[p]
+            j = J[p]
+
+            offsets = a[j, np.newaxis, np.newaxis] * roots[:, np.newaxis] * tangents[j, np.newaxis, :]
+            points = midpoints[j, np.newaxis, :] + offsets
+            sources = np.broadcast_to(field_points[i, np.newaxis, :], points.shape)
+            g, gradg, hessg = eval_array(
+                points.reshape(-1, 2), sources.reshape(-1, 2), K, order, pairwise=True
+            )
+
+            G[p] = a[j] * (g.reshape(-1, k) @ weights)
+            if order:
+                gradg = np.einsum('k,pkd->pd', weights, gradg.reshape(-1, k, 2))
+            if normal_derivative:
+                Q[p] = a[j] * np.sum(gradg * normals[j], axis=1)
+
+            if analytical:
+                close = is_close(field_points[i], midpoints[j], lengths[j])
+                dG, dQ = log_part_correction(
+                    field_points[i[close]], midpoints[j[close]], normals[j[close]], lengths[j[close]],
+                    K, roots, weights,
+                )
+                G[p[close]] += dG
+                if normal_derivative:
+                    Q[p[close]] += dQ
+
+            if derivatives:
+                gradG[p] = -a[j, np.newaxis] * gradg
+            if derivatives and normal_derivative:
+                hessg = np.einsum('k,pkde,pe->pd', weights, hessg.reshape(-1, k, 2, 2), normals[j])
+                gradQ[p] = -a[j, np.newaxis] * hessg
+
+        if counters is not None:
+            counters[name] += len(P) * k
+
+    G = G.reshape(shape)
+    if normal_derivative:
+        Q = Q.reshape(shape)
+    if derivatives:
+        gradG = gradG.reshape((*shape, 2))
+    if derivatives and normal_derivative:
+        gradQ = gradQ.reshape((*shape, 2))
+
+    return G, Q, gradG, gradQ
+
+
+def influence_matrices(
+    midpoints,
+    normals,
+    lengths,
+    K,
+    quadrature='fixed',
+    analytical=False,
+    counters=None,
+    memory=2**27,
+):
+    """Influence matrices G and Q of elements at their midpoints, without
+    the jump of Q.
+
+    The fixed quadrature evaluates the Green function with eval_array for
+    the 4 Gauss points of all elements and chunks of midpoints that fit in
+    memory bytes. The adaptive quadrature uses influence_coefficients.
+    Parameters are as in influence_coefficients.
+    """
+
+    if quadrature == 'adaptive':
+        G, Q, _, _ = influence_coefficients(
+            midpoints, midpoints, normals, lengths, K,
+            quadrature=quadrature, analytical=analytical, counters=counters, memory=memory,
+        )
+        return G, Q
+    elif quadrature != 'fixed':
+        raise ValueError(f"Invalid quadrature: {quadrature}")
+
+    n = len(midpoints)
+    G = np.empty((n, n), dtype=np.complex128)
+    Q = np.empty((n, n), dtype=np.complex128)
+
+    roots, weights = quadrature_rules['near']
+    a = 0.5 * lengths
+    tangents = np.column_stack((-normals[:, 1], normals[:, 0]))
+
+    # Gauss points of all elements, with shape (4n, 2).
+    offsets = a[:, np.newaxis, np.newaxis] * roots[:, np.newaxis] * tangents[:, np.newaxis, :]
+    points = (midpoints[:, np.newaxis, :] + offsets).reshape(-1, 2)
+
+    chunk = max(1, memory // (3 * 16 * len(points)))
+    for i in range(0, n, chunk):
+        g, gradg, _ = eval_array(points, midpoints[i:i+chunk], K, order=1)
+        g = g.reshape(n, len(roots), -1)
+        gradg = gradg.reshape(n, len(roots), -1, 2)
+
+        G[i:i+chunk] = (a[:, np.newaxis] * np.einsum('k,jki->ji', weights, g)).T
+        q = np.einsum('k,jkid,jd->ji', weights, gradg, normals)
+        Q[i:i+chunk] = (a[:, np.newaxis] * q).T
+
+    if counters is not None:
+        counters['fixed'] += len(points) * n
+
+    if analytical:
+        add_log_part_correction(G, Q, midpoints, normals, lengths, K)
+
+    return G, Q
+
+
+def influence_hmatrices(
+    midpoints,
+    normals,
+    lengths,
+    K,
+    jumps,
+    quadrature='fixed',
+    analytical=False,
+    counters=None,
+    **options,
+):
+    """H-matrices of the influence matrices G and Q of elements at their
+    midpoints, with jumps added to the diagonal of Q.
+
+    G and Q are built with hmatrix.build_hmatrix, of the floating cylinder
+    post, which is imported on the first call. Their blocks are evaluated
+    with influence_coefficients. The blocks of G only evaluate the Green
+    function value. The diagonal is in the dense leaf blocks, where the jumps
+    are added.
+
+    Parameters
+    ----------
+    jumps : numpy.ndarray
+        Jump of Q at each element, with shape (N,).
+    **options
+        Keyword arguments of hmatrix.build_hmatrix, such as tol, leaf_size or
+        eta.
+
+    Other parameters are as in influence_coefficients.
+
+    Returns
+    -------
+    G, Q : HMatrix
+        Influence matrices.
+    """
+
+    # H-matrices of the floating cylinder post, only needed by this assembly.
+    hmatrix_dir = str(Path(__file__).resolve().parents[2] / '0008_bem_floating_cylinder' / 'files')
+    if hmatrix_dir not in sys.path:
+        sys.path.append(hmatrix_dir)
+    from hmatrix import build_hmatrix
+
+    kwargs = {'quadrature': quadrature, 'analytical': analytical, 'counters': counters}
+
+    def get_block_G(rows, cols):
+        G, _, _, _ = influence_coefficients(
+            midpoints[rows], midpoints[cols], normals[cols], lengths[cols], K,
+            normal_derivative=False, **kwargs,
+        )
+        return G
+
+    def get_block_Q(rows, cols):
+        _, Q, _, _ = influence_coefficients(
+            midpoints[rows], midpoints[cols], normals[cols], lengths[cols], K, **kwargs
+        )
+        return Q + jumps[rows, np.newaxis] * (rows[:, np.newaxis] == cols)
+
+    G = build_hmatrix(midpoints, get_block_G, dtype=np.complex128, **options)
+    Q = build_hmatrix(midpoints, get_block_Q, dtype=np.complex128, **options)
+
+    return G, Q
+
+
+def influence_entries(
+    i,
+    j,
+    midpoints,
+    normals,
+    lengths,
+    K,
+    jumps,
+    quadrature='fixed',
+    analytical=False,
+    counters=None,
+):
+    """Entries Q[i, j] of the influence matrix Q, with the jumps, for index
+    arrays i and j, such as those of the preconditioners of iterative.solve.
+    Parameters are as in influence_hmatrices."""
+
+    i, j = np.broadcast_arrays(i, j)
+    ii = i.ravel()
+    jj = j.ravel()
+    _, Q, _, _ = influence_coefficients(
+        midpoints[ii], midpoints[jj], normals[jj], lengths[jj], K,
+        quadrature=quadrature, analytical=analytical, counters=counters, pairwise=True,
+    )
+
+    return (Q + jumps[ii] * (ii == jj)).reshape(i.shape)
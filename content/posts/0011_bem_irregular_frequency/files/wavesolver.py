@@ -1,10 +1,26 @@
 import numpy as np
+from scipy.linalg import lu_solve
 from twodubem.solver import Solver
+import iterative
 
 
 class WaveSolver(Solver):
-
-    def __init__(self, body, green):
+    """Wave problem solver.
+
+    Parameters
+    ----------
+    body : Polygon
+        Body and interior free surface boundary.
+    green : FreeSurface
+        Free surface Green function with influence matrices.
+    linear_solver : str, default='direct'
+        Linear system solver: 'direct' or 'gmres'.
+    solver_options : dict, default=None
+        Keyword arguments of iterative.solve, such as preconditioner, tol or
+        operator, a matrix-free product with the Q matrix.
+    """
+
+    def __init__(self, body, green, linear_solver='direct', solver_options=None):
         self.body = body
         self.green = green
         self.g = green.g
@@ -12,6 +28,8 @@ class WaveSolver(Solver):
         self.K = green.K
         self.L = 2*np.pi / self.K
         self.rho = 1.0
+        self.linear_solver = linear_solver
+        self.solver_options = {} if solver_options is None else solver_options
         self._build_boundary_condition_vector()
 
     def _build_boundary_condition_vector(self):
@@ -19,41 +37,69 @@ class WaveSolver(Solver):
 
     def solve(self):
         b = self.green.G @ self.q
-        self.phi = np.linalg.solve(self.green.Q, b)
+        self.phi = self._solve_linear_system(b)
+
+    def _solve_linear_system(self, b):
+        """Solve Q phi = b, with iteration counts and residual histories of
+        the iterative solver in linear_solver_info.
+
+        The direct solver reuses the LU factorization of Q owned by the Green
+        function, so solvers of the same frequency factorize Q only once. With
+        H-matrices, GMRES uses products with the H-matrix of Q, and the
+        preconditioner evaluates the entries it needs.
+        """
+
+        if self.linear_solver == 'direct':
+            return lu_solve(self.green.lu, b)
+        elif self.linear_solver == 'gmres':
+            options = {'points': self.body.midpoints, **self.solver_options}
+            if self.green.assembly == 'hmatrix':
+                entries = lambda i, j: self.green.get_influence_entries(i, j, self.body)
+                phi, self.linear_solver_info = iterative.solve(
+                    entries, b, **{'operator': self.green.Q, **options}
+                )
+            else:
+                phi, self.linear_solver_info = iterative.solve(self.green.Q, b, **options)
+            return phi
 
-    def get_solution(self, X, Z):
-        """Get solution for array of points."""
+        raise ValueError(f"Invalid linear solver: {self.linear_solver}")
 
-        n = self.body.number_of_elements
-        x = X.ravel()
-        z = Z.ravel()
-        u = np.empty(x.shape, dtype=np.complex128)
-        v = np.empty((*x.shape, 2), dtype=np.complex128)
-        G = np.empty(n, dtype=np.complex128)
-        Q = np.empty(n, dtype=np.complex128)
-        gradG = np.empty((2, n), dtype=np.complex128)
-        gradQ = np.empty((2, n), dtype=np.complex128)
-        dpi = 2*np.pi
+    def get_solution(self, X, Z, gradient=True, memory=2**27):
+        """Get solution for array of points.
 
-        for i in range(len(x)):
+        The gradient, i.e. the velocities, is only computed if gradient is
+        True, and is None otherwise. Influence coefficients are computed for
+        chunks of points that fit in memory bytes. Solutions with several
+        columns, such as the radiation potentials of each degree of freedom,
+        have the column as the last axis.
+        """
 
-            field_point = np.array([x[i], z[i]])
+        n = self.body.number_of_elements
+        points = np.column_stack((X.ravel(), Z.ravel()))
+        columns = self.phi.shape[1:]
+        u = np.empty((len(points), *columns), dtype=np.complex128)
+        v = np.empty((len(points), 2, *columns), dtype=np.complex128)
+        dpi = 2*np.pi
 
-            for j, source_element in enumerate(self.body.elements):
-                g, q, gradg, gradq = self.green.get_element_influence_coefficients(
-                    source_element,
-                    field_point,
+        chunk = max(1, memory // ((2 + 4*gradient) * 16 * n))
+        for i in range(0, len(points), chunk):
+            G, Q, gradG, gradQ = self.green.get_influence_coefficients(
+                points[i:i+chunk],
+                self.body.midpoints,
+                self.body.normals,
+                self.body.lengths,
+                derivatives=int(gradient),
+            )
+
+            u[i:i+chunk] = Q @ self.phi - G @ self.q
+            if gradient:
+                v[i:i+chunk] = (
+                    np.einsum('mjd,j...->md...', gradQ, self.phi)
+                    - np.einsum('mjd,j...->md...', gradG, self.q)
                 )
-                G[j] = g
-                Q[j] = q
-                gradG[:, j] = gradg
-                gradQ[:, j] = gradq
-            
-            u[i] = Q @ self.phi - G @ self.q
-            v[i] = gradQ @ self.phi - gradG @ self.q
 
-        phi = u.reshape(X.shape) / dpi
-        gradphi = v.reshape((*X.shape, 2)) / dpi
+        phi = u.reshape((*X.shape, *columns)) / dpi
+        gradphi = v.reshape((*X.shape, 2, *columns)) / dpi if gradient else None
 
         return phi, gradphi
 
@@ -65,7 +111,7 @@ class WaveSolver(Solver):
         elif other.green is not self.green:
             raise ValueError("Operands must have the same Green function")
             
-        solver_sum = WaveSolver(self.body, self.green)
+        solver_sum = WaveSolver(self.body, self.green, self.linear_solver, self.solver_options)
         solver_sum.phi = self.phi + other.phi
         solver_sum.q = self.q + other.q
 
@@ -98,41 +144,6 @@ class RadiationSolver(WaveSolver):
         self.added_mass = f.real / self.w**2
         self.radiation_damping = f.imag / self.w
 
-    def get_solution(self, X, Z):
-        nd = len(self.body.dofs)
-        ne = self.body.number_of_elements
-        x = X.ravel()
-        z = Z.ravel()
-        u = np.empty((*x.shape, nd), dtype=np.complex128)
-        v = np.empty((*x.shape, 2, nd), dtype=np.complex128)
-        G = np.empty(ne, dtype=np.complex128)
-        Q = np.empty(ne, dtype=np.complex128)
-        gradG = np.empty((2, ne), dtype=np.complex128)
-        gradQ = np.empty((2, ne), dtype=np.complex128)
-        dpi = 2*np.pi
-
-        for i in range(len(x)):
-
-            field_point = np.array([x[i], z[i]])
-
-            for j, source_element in enumerate(self.body.elements):
-                g, q, gradg, gradq = self.green.get_element_influence_coefficients(
-                    source_element,
-                    field_point,
-                )
-                G[j] = g
-                Q[j] = q
-                gradG[:, j] = gradg
-                gradQ[:, j] = gradq
-            
-            u[i] = Q @ self.phi - G @ self.q
-            v[i] = gradQ @ self.phi - gradG @ self.q
-
-        phi = u.reshape((*X.shape, nd)) / dpi
-        gradphi = v.reshape((*X.shape, 2, nd)) / dpi
-
-        return phi, gradphi
-
 
 class DiffractionSolver(WaveSolver):
     """Solver for the diffraction problem."""
@@ -153,7 +164,7 @@ class DiffractionSolver(WaveSolver):
         b = self.green.G @ self.q
 
         self.phi0 = phi0
-        self.phi = np.linalg.solve(self.green.Q, b)
+        self.phi = self._solve_linear_system(b)
 
     def compute_exciting_forces(self):
         nd = len(self.body.dofs)
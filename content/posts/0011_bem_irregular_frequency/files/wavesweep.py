@@ -0,0 +1,231 @@
+import os
+import sys
+import numpy as np
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from body import Body
+from wavegreen import FreeSurface
+from wavesolver import RadiationSolver, DiffractionSolver
+
+# Environment variables of the thread pools of BLAS libraries and Numba.
+thread_variables = [
+    'OMP_NUM_THREADS',
+    'OPENBLAS_NUM_THREADS',
+    'MKL_NUM_THREADS',
+    'BLIS_NUM_THREADS',
+    'VECLIB_MAXIMUM_THREADS',
+    'NUMBA_NUM_THREADS',
+]
+
+# Worker's body, set by init_worker.
+_shared_body = None
+
+
+class SharedBody(Body):
+    """Body whose geometry arrays are views of a shared memory block.
+
+    It holds what FreeSurface, RadiationSolver and DiffractionSolver need to
+    compute the radiation coefficients and exciting forces, but no elements.
+
+    Parameters
+    ----------
+    shm : multiprocessing.shared_memory.SharedMemory
+        Shared memory block, kept open while the body exists.
+    layout : dict
+        Offset, shape and dtype of each array in the block.
+    number_of_body_elements : int
+        Number of body elements, the remaining are lid elements.
+    dof_names : list[str]
+        Degrees of freedom, in the order of the rows of the dofs array.
+    """
+
+    def __init__(self, shm, layout, number_of_body_elements, dof_names):
+        super().__init__()
+        self._shm = shm
+        arrays = {
+            name: np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=offset)
+            for name, (offset, shape, dtype) in layout.items()
+        }
+
+        self.midpoints = arrays['midpoints']
+        self.normals = arrays['normals']
+        self.lengths = arrays['lengths']
+        self.number_of_elements = len(self.lengths)
+        self.number_of_body_elements = number_of_body_elements
+        self._set_masks()
+        self.dofs = {name: arrays['dofs'][i] for i, name in enumerate(dof_names)}
+
+
+def share_arrays(arrays):
+    """Copy arrays into a new shared memory block.
+
+    Returns
+    -------
+    shm : multiprocessing.shared_memory.SharedMemory
+        Shared memory block. The caller must close and unlink it.
+    layout : dict
+        Offset, shape and dtype of each array in the block.
+    """
+
+    layout = {}
+    size = 0
+    for name, array in arrays.items():
+        size = -(-size // 64) * 64  # 64 byte aligned
+        layout[name] = (size, array.shape, array.dtype.str)
+        size += array.nbytes
+
+    shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+    for name, array in arrays.items():
+        offset, shape, dtype = layout[name]
+        np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=offset)[...] = array
+
+    return shm, layout
+
+
+def limit_threads(threads):
+    """Limit the BLAS and Numba thread pools of the current process.
+
+    The environment variables only affect libraries loaded afterwards. BLAS
+    libraries already loaded, e.g. by NumPy, are limited with threadpoolctl,
+    if it is installed, and Numba, if already imported, with set_num_threads.
+    """
+
+    os.environ.update({name: str(threads) for name in thread_variables})
+
+    try:
+        from threadpoolctl import threadpool_limits
+    except ImportError:
+        pass
+    else:
+        threadpool_limits(threads)
+
+    if 'numba' in sys.modules:
+        sys.modules['numba'].set_num_threads(threads)
+
+
+def init_worker(shm_name, layout, number_of_body_elements, dof_names, threads):
+    """Limit the worker's thread pools, attach it to the shared memory block
+    and build its body."""
+
+    global _shared_body
+
+    limit_threads(threads)
+    shm = shared_memory.SharedMemory(name=shm_name)
+    _shared_body = SharedBody(shm, layout, number_of_body_elements, dof_names)
+
+
+def solve_frequency(w, green_options, linear_solver, solver_options):
+    """Radiation coefficients and exciting forces of the worker's body.
+
+    Returns
+    -------
+    added_mass, radiation_damping : numpy.ndarray
+        Radiation coefficients with shape (ndof, ndof).
+    force : numpy.ndarray
+        Exciting forces with shape (ndof,).
+    """
+
+    body = _shared_body
+    green = FreeSurface(w, body, **green_options)
+
+    rsolver = RadiationSolver(body, green, linear_solver, solver_options)
+    rsolver.solve()
+    rsolver.compute_radiation_coefficients()
+
+    dsolver = DiffractionSolver(body, green, linear_solver, solver_options)
+    dsolver.compute_exciting_forces()
+
+    return rsolver.added_mass, rsolver.radiation_damping, dsolver.force
+
+
+def sweep(
+    body,
+    wv,
+    workers=None,
+    blas_threads=1,
+    linear_solver='direct',
+    solver_options=None,
+    **green_options,
+):
+    """Radiation coefficients and exciting forces for an array of frequencies.
+
+    Frequencies are independent, so each one is assembled and solved in a
+    worker process. The body geometry and degrees of freedom are copied once
+    into shared memory, which the workers read without copies. Each worker
+    limits its BLAS and Numba thread counts to blas_threads when it starts
+    (see limit_threads), so that workers * blas_threads does not
+    oversubscribe the processors. The environment of this process is not
+    changed.
+
+    Parameters
+    ----------
+    body : Body
+        Body and interior free surface boundary, with its degrees of freedom.
+    wv : array_like[float]
+        Wave frequencies.
+    workers : int, default=None
+        Number of worker processes. Defaults to the number of processors
+        divided by blas_threads.
+    blas_threads : int, default=1
+        Number of BLAS and Numba threads of each worker.
+    linear_solver : str, default='direct'
+        Linear system solver of RadiationSolver and DiffractionSolver:
+        'direct' or 'gmres'. H-matrix assembly requires 'gmres'.
+    solver_options : dict, default=None
+        Keyword arguments of iterative.solve.
+    **green_options
+        Keyword arguments of FreeSurface, such as backend, quadrature or
+        assembly.
+
+    Returns
+    -------
+    added_mass : numpy.ndarray
+        Added mass with shape (len(wv), ndof, ndof).
+    radiation_damping : numpy.ndarray
+        Radiation damping with shape (len(wv), ndof, ndof).
+    exciting_force : numpy.ndarray
+        Exciting forces with shape (len(wv), ndof).
+    """
+
+    if green_options.get('assembly') == 'hmatrix' and linear_solver != 'gmres':
+        raise ValueError("H-matrix assembly requires linear_solver='gmres'")
+
+    wv = np.asarray(wv, dtype=np.float64)
+    dof_names = list(body.dofs)
+    nd = len(dof_names)
+
+    if workers is None:
+        workers = max(1, (os.cpu_count() or 1) // blas_threads)
+
+    arrays = {
+        'midpoints': np.ascontiguousarray(body.midpoints, dtype=np.float64),
+        'normals': np.ascontiguousarray(body.normals, dtype=np.float64),
+        'lengths': np.ascontiguousarray(body.lengths, dtype=np.float64),
+        'dofs': np.array([body.dofs[name] for name in dof_names], dtype=np.float64).reshape(nd, -1),
+    }
+
+    added_mass = np.empty((len(wv), nd, nd))
+    radiation_damping = np.empty((len(wv), nd, nd))
+    exciting_force = np.empty((len(wv), nd), dtype=np.complex128)
+
+    shm, layout = share_arrays(arrays)
+    try:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=init_worker,
+            initargs=(shm.name, layout, body.number_of_body_elements, dof_names, blas_threads),
+        ) as executor:
+            futures = [
+                executor.submit(solve_frequency, w, green_options, linear_solver, solver_options)
+                for w in wv
+            ]
+
+            for i, future in enumerate(futures):
+                added_mass[i], radiation_damping[i], exciting_force[i] = future.result()
+    finally:
+        shm.close()
+        shm.unlink()
+
+    return added_mass, radiation_damping, exciting_force
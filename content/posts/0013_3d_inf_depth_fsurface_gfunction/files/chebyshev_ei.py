@@ -0,0 +1,212 @@
+import math
+import bisect
+import numpy as np
+from pathlib import Path
+
+
+coefs_file = Path(__file__).resolve().parent / 'chebyshev_ei.npz'
+
+# Root of Ei(x), as the sum of two floats.
+x0 = 0.3725074107813666
+x0_lo = 1.3140183414386028e-17
+
+# Subintervals of (0, 40] and the function approximated in each one:
+# 0: Ei(x) - log(x), 1: Ei(x) / (x - x0), 2: exp(-x) * Ei(x).
+breakpoints = np.array([0.0, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 12.0, 16.0, 24.0, 32.0, 40.0])
+kinds = np.array([0, 1, 2, 2, 2, 2, 2, 2, 2, 2, 2])
+
+
+def generate_coefficients(filename=coefs_file, degree=40, dps=40):
+    """Generate Chebyshev coefficients of each subinterval with mpmath.
+
+    Coefficients are computed by interpolation at the Chebyshev points of the
+    first kind and trailing coefficients below 1e-18 are discarded.
+    """
+
+    import mpmath as mp
+
+    n = degree + 1
+    coefs = np.zeros((len(kinds), n))
+
+    with mp.workdps(dps):
+        root = mp.findroot(mp.ei, x0)
+        functions = [
+            lambda x: mp.ei(x) - mp.log(x),
+            lambda x: mp.ei(x) / (x - root),
+            lambda x: mp.exp(-x) * mp.ei(x),
+        ]
+
+        for i, kind in enumerate(kinds):
+            a = mp.mpf(breakpoints[i])
+            b = mp.mpf(breakpoints[i+1])
+            theta = [mp.pi * (k + mp.mpf(0.5)) / n for k in range(n)]
+            fk = [functions[kind](0.5*(b + a) + 0.5*(b - a)*mp.cos(t)) for t in theta]
+
+            for j in range(n):
+                cj = 2 * mp.fsum(f * mp.cos(j*t) for f, t in zip(fk, theta)) / n
+                coefs[i, j] = float(cj)
+            coefs[i, 0] *= 0.5
+
+    # Discard negligible trailing coefficients.
+    scale = np.abs(coefs).max(axis=1, keepdims=True)
+    coefs[np.abs(coefs) < 1.0e-18 * scale] = 0.0
+    nterms = np.max(np.nonzero(coefs)[1]) + 1
+
+    np.savez(filename, breakpoints=breakpoints, kinds=kinds, coefs=coefs[:, :nterms])
+
+
+def load_coefficients(filename=coefs_file):
+    if not Path(filename).exists():
+        raise FileNotFoundError(
+            f"{filename} not found, generate it with: python chebyshev_ei.py"
+        )
+
+    data = np.load(filename)
+
+    return data['breakpoints'], data['kinds'], data['coefs']
+
+
+def clenshaw(t, c):
+    """Evaluate Chebyshev series with coefficients c[i] at each t[i]."""
+
+    b1 = np.zeros_like(t)
+    b2 = np.zeros_like(t)
+    t2 = 2*t
+    for k in range(c.shape[1] - 1, 0, -1):
+        b1, b2 = t2*b1 - b2 + c[:, k], b1
+
+    return t*b1 - b2 + c[:, 0]
+
+
+def eval_table(x):
+    """Approximated function in the subinterval of each x in (0, 40]."""
+
+    i = np.clip(np.searchsorted(table_breakpoints, x) - 1, 0, len(table_kinds) - 1)
+    a = table_breakpoints[i]
+    b = table_breakpoints[i+1]
+    t = (2*x - (b + a)) / (b - a)
+
+    return clenshaw(t, table_coefs[i]), table_kinds[i]
+
+
+def asymptotic_expei(x):
+    """exp(-x) * Ei(x) asymptotic expansion, for x > 40."""
+
+    sk = np.ones_like(x)
+    ex = np.ones_like(x)
+    for k in range(1, 24):
+        sk = sk * k/x
+        ex = ex + sk
+
+    return ex / x
+
+
+def expei_scalar(x):
+    """exp(-x) * Ei(x) for a float x ≥ 0, with Python floats only.
+
+    Same approximation as expei, without the array overhead, for callers that
+    evaluate one point at a time. It is NaN for x < 0 and NaN.
+    """
+
+    if not x >= 0.0:
+        return math.nan
+    elif x == 0.0:
+        return -1.0e+300
+    elif x > 40.0:
+        sk = 1.0
+        ex = 1.0
+        for k in range(1, 24):
+            sk *= k/x
+            ex += sk
+        return ex / x
+
+    i = min(bisect.bisect_left(scalar_breakpoints, x) - 1, len(scalar_kinds) - 1)
+    a = scalar_breakpoints[i]
+    b = scalar_breakpoints[i+1]
+    t = (2*x - (b + a)) / (b - a)
+
+    # Clenshaw recurrence.
+    c = scalar_coefs[i]
+    t2 = 2*t
+    b1 = 0.0
+    b2 = 0.0
+    for k in range(len(c) - 1, 0, -1):
+        b1, b2 = t2*b1 - b2 + c[k], b1
+    f = t*b1 - b2 + c[0]
+
+    kind = scalar_kinds[i]
+    if kind == 0:
+        return math.exp(-x) * (f + math.log(x))
+    elif kind == 1:
+        return math.exp(-x) * f * ((x - x0) - x0_lo)
+
+    return f
+
+
+def expei(x):
+    """exp(-x) * Ei(x) for an array of x ≥ 0, NaN for x < 0 and NaN.
+
+    A float is returned for scalar x.
+    """
+
+    x = np.asarray(x, dtype=np.float64)
+    ex = np.full_like(x, np.nan)
+
+    zero = x == 0.0
+    table = (x > 0.0) & (x <= 40.0)
+    asymptotic = x > 40.0
+
+    ex[zero] = -1.0e+300
+
+    xt = x[table]
+    f, kind = eval_table(xt)
+    ex[table] = np.where(
+        kind == 0,
+        np.exp(-xt) * (f + np.log(xt)),
+        np.where(kind == 1, np.exp(-xt) * f * ((xt - x0) - x0_lo), f),
+    )
+
+    ex[asymptotic] = asymptotic_expei(x[asymptotic])
+
+    return float(ex) if ex.ndim == 0 else ex
+
+
+def ei(x):
+    """Exponential integral Ei(x) for an array of x ≥ 0, NaN for x < 0 and NaN.
+
+    A float is returned for scalar x.
+    """
+
+    x = np.asarray(x, dtype=np.float64)
+    e = np.full_like(x, np.nan)
+
+    zero = x == 0.0
+    table = (x > 0.0) & (x <= 40.0)
+    asymptotic = x > 40.0
+
+    e[zero] = -1.0e+300
+
+    xt = x[table]
+    f, kind = eval_table(xt)
+    e[table] = np.where(
+        kind == 0,
+        f + np.log(xt),
+        np.where(kind == 1, f * ((xt - x0) - x0_lo), np.exp(xt) * f),
+    )
+
+    xa = x[asymptotic]
+    e[asymptotic] = np.exp(xa) * asymptotic_expei(xa)
+
+    return float(e) if e.ndim == 0 else e
+
+
+table_breakpoints, table_kinds, table_coefs = load_coefficients()
+
+# Tables as Python lists for expei_scalar, with trailing zeros removed.
+scalar_breakpoints = table_breakpoints.tolist()
+scalar_kinds = table_kinds.tolist()
+scalar_coefs = [np.trim_zeros(c, 'b').tolist() for c in table_coefs]
+
+
+if __name__ == '__main__':
+    generate_coefficients()
@@ -1,6 +1,7 @@
 import scipy as sc
 import numpy as np
 import mpmath as mp
+import chebyshev_ei
 
 
 mp.dps = 16
@@ -90,17 +91,7 @@ def fsem(x, y):
 def expei(x):
     """exp(-x) * Ei(x)."""
 
-    if x > 40.0:
-        sk = 1.0
-        ex = 1.0
-        for k in range(1, 24):
-            sk *= k/x
-            ex += sk
-        ex *= 1/x
-    else:
-        ex = mp.exp(-x) * mp.ei(x)
-    
-    return ex
+    return chebyshev_ei.expei_scalar(x)
 
 
 def fsem1(x, y, nterms=19):